@@ -10,7 +10,7 @@ from src.database.models import Base
 # access to the values within the .ini file in use.
 config = context.config
 
-config.set_main_option('sqlalchemy.url', settings.db_url)
+config.set_main_option('sqlalchemy.url', settings.sync_db_url)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -0,0 +1,31 @@
+"""cache outbox
+
+Revision ID: 5c1e7a9d3b42
+Revises: 24168b8023e2
+Create Date: 2026-10-18 10:12:41.218463
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a9d3b42'
+down_revision = '24168b8023e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('cache_outbox',
+                    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+                    sa.Column('entity', sa.String(), nullable=False),
+                    sa.Column('action', sa.String(), nullable=False),
+                    sa.Column('ids', sa.JSON(), nullable=False),
+                    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+
+
+def downgrade() -> None:
+    op.drop_table('cache_outbox')
@@ -0,0 +1,24 @@
+"""foreign key indexes
+
+Revision ID: 8f3d2b6a1c07
+Revises: 5c1e7a9d3b42
+Create Date: 2026-10-18 11:40:05.731926
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8f3d2b6a1c07'
+down_revision = '5c1e7a9d3b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_submenu_menu_group_id', 'submenu', ['menu_group', 'id'], unique=False)
+    op.create_index('ix_dish_submenu_group_id', 'dish', ['submenu_group', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dish_submenu_group_id', table_name='dish')
+    op.drop_index('ix_submenu_menu_group_id', table_name='submenu')
@@ -0,0 +1,32 @@
+"""materialized counters
+
+Revision ID: 6a2c8e5f0b19
+Revises: 3b9e4f1a7d25
+Create Date: 2026-10-18 14:22:48.093615
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '6a2c8e5f0b19'
+down_revision = '3b9e4f1a7d25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('menu', sa.Column('submenus_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('menu', sa.Column('dishes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('submenu', sa.Column('dishes_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute('UPDATE submenu SET dishes_count = (SELECT count(*) FROM dish WHERE dish.submenu_group = submenu.id)')
+    op.execute('UPDATE menu SET submenus_count = (SELECT count(*) FROM submenu WHERE submenu.menu_group = menu.id), '
+               'dishes_count = (SELECT coalesce(sum(submenu.dishes_count), 0) FROM submenu '
+               'WHERE submenu.menu_group = menu.id)')
+
+
+def downgrade() -> None:
+    op.drop_column('submenu', 'dishes_count')
+    op.drop_column('menu', 'dishes_count')
+    op.drop_column('menu', 'submenus_count')
@@ -0,0 +1,27 @@
+"""numeric dish price
+
+Revision ID: 3b9e4f1a7d25
+Revises: 8f3d2b6a1c07
+Create Date: 2026-10-18 13:05:27.514380
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3b9e4f1a7d25'
+down_revision = '8f3d2b6a1c07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Stored prices are strings formatted with two decimal places
+    op.alter_column('dish', 'price', type_=sa.Numeric(10, 2), existing_type=sa.String(), existing_nullable=False,
+                    postgresql_using='price::numeric(10, 2)')
+
+
+def downgrade() -> None:
+    op.alter_column('dish', 'price', type_=sa.String(), existing_type=sa.Numeric(10, 2), existing_nullable=False,
+                    postgresql_using='price::text')
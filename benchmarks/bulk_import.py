@@ -0,0 +1,81 @@
+"""
+Measures the bulk import of a generated catalog against the same catalog posted item by item.
+
+Builds --menus menus with --submenus submenus each and --dishes dishes in every submenu, imports them
+with one request and reports the time and the rate of dishes per second. With --sequential the same
+catalog is also posted through the per-item routes. The imported menus are deleted at the end.
+
+Usage (PostgreSQL and Redis must be reachable with the settings from .env):
+    python -m benchmarks.bulk_import --menus 10 --submenus 100 --dishes 100
+"""
+import argparse
+import asyncio
+import time
+
+import orjson
+from httpx import AsyncClient
+
+from src.cache.client import close_redis
+from src.main import app
+
+
+def catalog(menus: int, submenus: int, dishes: int, prefix: str) -> list[dict]:
+    return [{'title': f'{prefix} menu {menu}', 'description': 'description', 'submenus': [
+        {'title': f'{prefix} submenu {menu} {submenu}', 'description': 'description', 'dishes': [
+            {'title': f'{prefix} dish {menu} {submenu} {dish}', 'description': 'description', 'price': '10.50'}
+            for dish in range(dishes)]}
+        for submenu in range(submenus)]}
+        for menu in range(menus)]
+
+
+async def post_sequentially(ac: AsyncClient, document: list[dict]) -> None:
+    for menu in document:
+        menu_id = (await ac.post('/api/v1/menus/', json={
+            'title': menu['title'], 'description': menu['description']})).json()['id']
+        for submenu in menu['submenus']:
+            submenu_id = (await ac.post(f'/api/v1/menus/{menu_id}/submenus/', json={
+                'title': submenu['title'], 'description': submenu['description']})).json()['id']
+            for dish in submenu['dishes']:
+                await ac.post(f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/', json=dish)
+
+
+async def delete_menus(ac: AsyncClient, prefix: str) -> None:
+    cursor = None
+    while True:
+        response = await ac.get('/api/v1/menus/', params={'limit': 1000, **({'cursor': cursor} if cursor else {})})
+        for menu in response.json():
+            if menu['title'].startswith(prefix):
+                await ac.delete(f'/api/v1/menus/{menu["id"]}')
+        cursor = response.headers.get('x-next-cursor')
+        if not cursor:
+            return
+
+
+async def main(menus: int, submenus: int, dishes: int, sequential: bool) -> None:
+    total = menus * submenus * dishes
+    async with AsyncClient(app=app, base_url='http://benchmark', timeout=None) as ac:
+        body = orjson.dumps(catalog(menus, submenus, dishes, 'bulk'))
+        started = time.perf_counter()
+        response = await ac.post('/api/v1/menus/import', content=body, headers={'Content-Type': 'application/json'})
+        elapsed = time.perf_counter() - started
+        print(f'bulk import  status={response.status_code} dishes={total} {elapsed:.2f} s '
+              f'{total / elapsed:.0f} dishes/s')
+        await delete_menus(ac, 'bulk')
+
+        if sequential:
+            started = time.perf_counter()
+            await post_sequentially(ac, catalog(menus, submenus, dishes, 'sequential'))
+            elapsed = time.perf_counter() - started
+            print(f'item by item dishes={total} {elapsed:.2f} s {total / elapsed:.0f} dishes/s')
+            await delete_menus(ac, 'sequential')
+    await close_redis()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--menus', type=int, default=10)
+    parser.add_argument('--submenus', type=int, default=100)
+    parser.add_argument('--dishes', type=int, default=100)
+    parser.add_argument('--sequential', action='store_true')
+    args = parser.parse_args()
+    asyncio.run(main(args.menus, args.submenus, args.dishes, args.sequential))
@@ -0,0 +1,76 @@
+"""
+Compares latency of the blocking redis client against the asyncio client under concurrent load.
+
+Every simulated request reads one cached key and then yields to the event loop, the same way a service
+method does on a cache hit. With the blocking client each read freezes the loop, so requests queue behind
+each other and the tail latency grows with the concurrency level.
+
+Usage (Redis must be reachable with the settings from .env):
+    python -m benchmarks.cache_client --requests 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import pickle
+import statistics
+import time
+
+import redis
+from redis import asyncio as aioredis
+
+from src.config import settings
+
+KEY = 'benchmark:menu'
+
+
+def percentile(values: list[float], rate: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * rate))]
+
+
+async def run(get, requests: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def request() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            value = await get(KEY)
+            pickle.loads(value)
+            await asyncio.sleep(0)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(request() for _ in range(requests)))
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    print(f'{name:<8} p50={statistics.median(latencies):8.3f}ms '
+          f'p99={percentile(latencies, 0.99):8.3f}ms max={max(latencies):8.3f}ms')
+
+
+async def main(requests: int, concurrency: int) -> None:
+    payload = pickle.dumps([{'id': i, 'title': f'menu {i}', 'description': 'description'} for i in range(50)])
+
+    sync_client = redis.StrictRedis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0)
+    sync_client.set(KEY, payload)
+
+    async def sync_get(key: str) -> bytes:
+        return sync_client.get(key)
+
+    async_client = aioredis.Redis(connection_pool=aioredis.BlockingConnectionPool(
+        host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0, max_connections=settings.REDIS_MAX_CONNECTIONS))
+
+    report('sync', await run(sync_get, requests, concurrency))
+    report('async', await run(async_client.get, requests, concurrency))
+
+    sync_client.delete(KEY)
+    sync_client.close()
+    await async_client.close(close_connection_pool=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
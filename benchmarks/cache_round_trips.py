@@ -0,0 +1,61 @@
+"""
+Counts Redis round trips of every write request, cache invalidation included. A round trip is one packed
+command sent over a connection: a single command or a whole pipeline.
+
+The requests go through the application in process, so the background tasks of a response are finished
+when the client gets it. Builds its own menu tree and deletes it at the end.
+
+Usage (PostgreSQL and Redis must be reachable with the settings from .env):
+    python -m benchmarks.cache_round_trips
+"""
+import asyncio
+
+from httpx import AsyncClient
+from redis.asyncio.connection import Connection
+
+from src.cache.client import close_redis
+from src.main import app
+
+round_trips = 0
+send_packed_command = Connection.send_packed_command
+
+
+async def counted_send_packed_command(self, *args, **kwargs):
+    global round_trips
+    round_trips += 1
+    return await send_packed_command(self, *args, **kwargs)
+
+
+async def measure(name: str, request) -> dict:
+    global round_trips
+    round_trips = 0
+    response = await request
+    print(f'{name:<16} status={response.status_code} round_trips={round_trips}')
+    return response.json()
+
+
+async def main() -> None:
+    Connection.send_packed_command = counted_send_packed_command
+    async with AsyncClient(app=app, base_url='http://benchmark') as ac:
+        menu = await measure('post menu', ac.post('/api/v1/menus/', json={
+            'title': 'round_trips_menu', 'description': 'description'}))
+        menu_url = f'/api/v1/menus/{menu["id"]}'
+        submenu = await measure('post submenu', ac.post(f'{menu_url}/submenus/', json={
+            'title': 'round_trips_submenu', 'description': 'description'}))
+        submenu_url = f'{menu_url}/submenus/{submenu["id"]}'
+        dish = await measure('post dish', ac.post(f'{submenu_url}/dishes/', json={
+            'title': 'round_trips_dish', 'description': 'description', 'price': '10'}))
+        dish_url = f'{submenu_url}/dishes/{dish["id"]}'
+
+        await measure('patch menu', ac.patch(menu_url, json={'title': 'patched', 'description': 'description'}))
+        await measure('patch submenu', ac.patch(submenu_url, json={'title': 'patched', 'description': 'description'}))
+        await measure('patch dish', ac.patch(dish_url, json={
+            'title': 'patched', 'description': 'description', 'price': '11'}))
+        await measure('delete dish', ac.delete(dish_url))
+        await measure('delete submenu', ac.delete(submenu_url))
+        await measure('delete menu', ac.delete(menu_url))
+    await close_redis()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
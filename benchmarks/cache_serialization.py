@@ -0,0 +1,40 @@
+"""
+Compares the cost of the cached payload formats: pickled ORM instances, as the services used to store them,
+against orjson bytes of the response models. Reports encode and decode time per payload and payload size.
+
+Usage:
+    python -m benchmarks.cache_serialization --items 100 --rounds 2000
+"""
+import argparse
+import pickle
+import timeit
+import uuid
+
+from src.cache.client import dumps, loads
+from src.database.models import Dish
+from src.menu_management.schemas.schemas import DishResponse
+
+
+def report(name: str, encode, decode, rounds: int) -> None:
+    payload = encode()
+    encode_time = timeit.timeit(encode, number=rounds) / rounds * 1_000_000
+    decode_time = timeit.timeit(lambda: decode(payload), number=rounds) / rounds * 1_000_000
+    print(f'{name:<8} encode={encode_time:9.1f}us decode={decode_time:9.1f}us size={len(payload):8d}B')
+
+
+def main(items: int, rounds: int) -> None:
+    dishes = [Dish(id=uuid.uuid4(), title=f'dish {number}', description='description of the dish',
+                   price='10.50', submenu_group=uuid.uuid4()) for number in range(items)]
+    responses = [DishResponse(id=dish.id, title=dish.title, description=dish.description, price=dish.price)
+                 for dish in dishes]
+
+    report('pickle', lambda: pickle.dumps(dishes), pickle.loads, rounds)
+    report('orjson', lambda: dumps(responses), loads, rounds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+    main(args.items, args.rounds)
@@ -0,0 +1,107 @@
+"""
+Reports query plans and execution times of the hot queries without and with the foreign key indexes.
+
+Seeds a catalog of --menus menus with --submenus submenus each and --dishes dishes in every submenu,
+drops the indexes, runs EXPLAIN ANALYZE for every query, creates the indexes and runs it again.
+The indexes are left in place and the seeded catalog is deleted at the end. The counter update and the cascade
+delete are explained in transactions that are rolled back.
+
+Usage (run against a development database, PostgreSQL must be reachable with the settings from .env):
+    python -m benchmarks.db_indexes --menus 200 --submenus 20 --dishes 50 --verbose
+"""
+import argparse
+import asyncio
+import re
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.database.db import engine
+
+SEED = [
+    """INSERT INTO menu (id, title, description, submenus_count, dishes_count)
+       SELECT gen_random_uuid(), 'benchmark menu ' || number, 'description', CAST(:submenus AS integer),
+              CAST(:submenus AS integer) * CAST(:dishes AS integer)
+       FROM generate_series(1, :menus) AS number""",
+    """INSERT INTO submenu (id, title, description, menu_group, dishes_count)
+       SELECT gen_random_uuid(), 'benchmark submenu ' || menu.id || ' ' || number, 'description', menu.id,
+              CAST(:dishes AS integer)
+       FROM menu, generate_series(1, :submenus) AS number
+       WHERE menu.title LIKE 'benchmark menu %'""",
+    """INSERT INTO dish (id, title, description, price, submenu_group)
+       SELECT gen_random_uuid(), 'benchmark dish ' || submenu.id || ' ' || number, 'description', '10.00', submenu.id
+       FROM submenu, generate_series(1, :dishes) AS number
+       WHERE submenu.title LIKE 'benchmark submenu %'""",
+]
+
+INDEXES = {
+    'ix_submenu_menu_group_id': 'CREATE INDEX ix_submenu_menu_group_id ON submenu (menu_group, id)',
+    'ix_dish_submenu_group_id': 'CREATE INDEX ix_dish_submenu_group_id ON dish (submenu_group, id)',
+}
+
+# The statements the repositories send, with the parameters of a seeded menu and submenu
+QUERIES = {
+    'menu with counts': """
+        SELECT menu.id, menu.title, menu.description, menu.submenus_count, menu.dishes_count
+        FROM menu WHERE menu.id = :menu_id""",
+    'submenu list page': """
+        SELECT submenu.id, submenu.title, submenu.description, submenu.dishes_count
+        FROM submenu WHERE submenu.menu_group = :menu_id ORDER BY submenu.id LIMIT 101""",
+    'dish counters': """
+        UPDATE submenu SET dishes_count = submenu.dishes_count + 1
+        WHERE submenu.id = :submenu_id RETURNING submenu.menu_group""",
+    'dish list page': """
+        SELECT dish.id, dish.title, dish.description, dish.price FROM dish
+        WHERE dish.submenu_group = :submenu_id ORDER BY dish.id LIMIT 101""",
+    'cascade delete': 'DELETE FROM menu WHERE menu.id = :menu_id',
+}
+
+
+async def explain(connection: AsyncConnection, params: dict, verbose: bool) -> None:
+    for name, query in QUERIES.items():
+        transaction = await connection.begin_nested()
+        result = await connection.execute(text(f'EXPLAIN (ANALYZE, BUFFERS) {query}'), params)
+        plan = [row[0] for row in result]
+        await transaction.rollback()
+        execution_time = next(line for line in plan if line.startswith('Execution Time'))
+        triggers = sum(float(time) for time in re.findall(r'^Trigger .*time=([\d.]+)', '\n'.join(plan), re.M))
+        print(f'  {name:<18} {execution_time}' + (f' + triggers {triggers:.3f} ms' if triggers else ''))
+        if verbose:
+            print('\n'.join(f'      {line}' for line in plan))
+
+
+async def main(menus: int, submenus: int, dishes: int, verbose: bool) -> None:
+    async with engine.connect() as connection:
+        async with connection.begin():
+            for statement in SEED:
+                await connection.execute(text(statement), {'menus': menus, 'submenus': submenus, 'dishes': dishes})
+            params = (await connection.execute(text(
+                """SELECT submenu.menu_group AS menu_id, submenu.id AS submenu_id FROM submenu
+                   WHERE submenu.title LIKE 'benchmark submenu %' LIMIT 1"""))).mappings().one()
+        print(f'seeded {menus} menus, {menus * submenus} submenus, {menus * submenus * dishes} dishes')
+
+        for stage in ('without indexes', 'with indexes'):
+            async with connection.begin() as transaction:
+                for index, create in INDEXES.items():
+                    await connection.execute(text(f'DROP INDEX IF EXISTS {index}'))
+                    if stage == 'with indexes':
+                        await connection.execute(text(create))
+                await connection.execute(text('ANALYZE menu, submenu, dish'))
+                await transaction.commit()
+            print(stage)
+            async with connection.begin():
+                await explain(connection, dict(params), verbose)
+
+        async with connection.begin():
+            await connection.execute(text("DELETE FROM menu WHERE title LIKE 'benchmark menu %'"))
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--menus', type=int, default=200)
+    parser.add_argument('--submenus', type=int, default=20)
+    parser.add_argument('--dishes', type=int, default=50)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    asyncio.run(main(args.menus, args.submenus, args.dishes, args.verbose))
@@ -0,0 +1,74 @@
+"""
+Shows how the connection pool of the application engine behaves at and past saturation.
+
+Every simulated request opens a session and holds its connection for --hold seconds with pg_sleep, as a slow
+request would. With more concurrent requests than DB_POOL_SIZE + DB_MAX_OVERFLOW connections the requests queue
+for a checkout, and past DB_POOL_TIMEOUT they fail. Reports throughput, latency percentiles, checkout waits
+and timeouts for every concurrency level.
+
+Usage (PostgreSQL must be reachable with the settings from .env, the pool is set by the DB_POOL_* variables):
+    DB_POOL_SIZE=5 DB_MAX_OVERFLOW=5 DB_POOL_TIMEOUT=2 python -m benchmarks.db_pool --requests 200 --hold 0.05
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError
+
+from src import metrics
+from src.config import settings
+from src.database.db import async_session_maker, engine, pool_status
+
+
+def percentile(values: list[float], rate: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * rate))] if values else 0.0
+
+
+async def run(requests: int, concurrency: int, hold: float) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    peak_in_use = 0
+
+    async def request() -> None:
+        nonlocal peak_in_use
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async with async_session_maker() as session:
+                    await session.execute(text('SELECT pg_sleep(:hold)'), {'hold': hold})
+                    peak_in_use = max(peak_in_use, pool_status()['db_pool_checked_out'])
+            except TimeoutError:
+                return
+            latencies.append(time.perf_counter() - started)
+
+    metrics.counters.clear()
+    metrics.gauges.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    checkouts = metrics.counters['db_pool_checkout_seconds_count']
+    average_wait = metrics.counters['db_pool_checkout_seconds_sum'] / checkouts if checkouts else 0.0
+    max_wait = metrics.gauges.get('db_pool_checkout_seconds_max', 0.0)
+    print(f'concurrency={concurrency:<4} rps={len(latencies) / elapsed:8.1f} '
+          f'p50={percentile(latencies, 0.5) * 1000:7.1f}ms p99={percentile(latencies, 0.99) * 1000:7.1f}ms '
+          f'wait avg={average_wait * 1000:7.1f}ms max={max_wait * 1000:7.1f}ms '
+          f'in_use_peak={peak_in_use:<3} timeouts={metrics.counters["db_pool_timeouts"]}')
+
+
+async def main(requests: int, hold: float) -> None:
+    capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    print(f'pool_size={settings.DB_POOL_SIZE} max_overflow={settings.DB_MAX_OVERFLOW} '
+          f'timeout={settings.DB_POOL_TIMEOUT}s hold={hold}s')
+    for concurrency in sorted({max(1, capacity // 2), capacity, capacity * 2, capacity * 4}):
+        await run(requests, concurrency, hold)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--hold', type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.hold))
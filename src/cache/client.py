@@ -1,27 +1,546 @@
-import pickle
+import asyncio
+import logging
+import math
+from typing import Awaitable, Callable, Iterable, Protocol, TypeVar
 
-import redis
+import orjson
+from pydantic import BaseModel
+from redis import asyncio as aioredis
+from redis.exceptions import ConnectionError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src import metrics
+from src.cache.entry import ENTRY_FORMAT, CacheEntry, Page
+from src.cache.local import LocalCache
 from src.config import settings
+from src.database.db import async_session_maker
 
-redis_client = redis.StrictRedis(host=f'{settings.REDIS_HOST}', port=settings.REDIS_PORT, db=0)
+logger = logging.getLogger(__name__)
+
+
+class Repository(Protocol):
+    """
+    Repository passed to the loaders, its read session is the replica session unless the request reads from the primary
+    """
+    session: AsyncSession
+    read_session: AsyncSession
+
+
+R = TypeVar('R', bound=Repository)
+Loader = Callable[[R], Awaitable[bytes | Page]]
+ManyLoader = Callable[[R, list[int]], Awaitable[dict[int, bytes]]]
+
+redis_pool = aioredis.BlockingConnectionPool(host=f'{settings.REDIS_HOST}', port=settings.REDIS_PORT, db=0,
+                                             max_connections=settings.REDIS_MAX_CONNECTIONS)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+local_cache = LocalCache(maxsize=settings.CACHE_L1_MAXSIZE if settings.CACHE_L1_ENABLED else 0,
+                         ttl=settings.CACHE_L1_TTL)
+# Loads running in this worker by cache key, awaited by every request that misses the same key
+in_flight: dict[str, asyncio.Task] = {}
+# Suffix of the in-flight key of a load reading from the replica, clients pinned to the primary do not await it
+REPLICA_LOAD = '@replica'
+
+
+async def open_redis() -> None:
+    """
+    Checks the shared connection pool on application startup
+
+    :return: None
+    """
+    await redis_client.ping()
+
+
+async def close_redis() -> None:
+    """
+    Closes the shared connection pool on application shutdown
+
+    :return: None
+    """
+    await redis_client.close(close_connection_pool=True)
+
+
+async def listen_invalidations() -> None:
+    """
+    Evicts local generation counters bumped by other workers. Runs for the whole life of the worker.
+    The local cache is dropped whenever the subscription is lost or a message can not be handled,
+    as invalidations may have been missed
+
+    :return: None
+    """
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        local_cache.delete(*loads(message['data']))
+        except ConnectionError:
+            logger.warning('Cache invalidation channel is lost, local cache is dropped')
+        except Exception:
+            logger.exception('Cache invalidation listener failed, local cache is dropped')
+        local_cache.clear()
+        await asyncio.sleep(1)
+
+
+def _log_failed_refresh(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning('Stale cache entry refresh failed', exc_info=task.exception())
+
+
+class CacheKey:
+    """
+    Cache keys follow the resource hierarchy menu -> submenu -> dish, so every key of a menu tree
+    starts with the key of the menu. The menu list and every menu tree have a generation counter:
+    the stored key embeds the current generation and the epoch of the whole cache, so bumping a counter
+    retires every key of the tree at once
+    """
+    PAGE = ':page:{limit}:{cursor}'
+    MENU_LIST = 'menus' + PAGE
+    MENU = 'menu:{menu_id}'
+    SUBMENU_LIST = MENU + ':submenus' + PAGE
+    SUBMENU = MENU + ':submenu:{submenu_id}'
+    DISH_LIST = SUBMENU + ':dishes' + PAGE
+    DISH = SUBMENU + ':dish:{dish_id}'
+    BASE = 'base'
+    EPOCH = 'gen:epoch'
+    BASE_GENERATION = 'gen:base'
+    MENU_LIST_GENERATION = 'gen:menus'
+    MENU_TREE_GENERATION = 'gen:' + MENU
+    # Hash of the id of the newest outbox event applied to every generation counter
+    GENERATION_EVENTS = 'gen:events'
+    WARMUP = 'warmup:{epoch}'
+    # Set for DB_PRIMARY_PIN_SECONDS when a counter is bumped, values of its new generation are loaded from
+    # the primary meanwhile, as the replica may not have the write yet
+    RECENTLY_BUMPED = 'bumped:{counter}'
+
+    @classmethod
+    def base(cls) -> str:
+        return cls.BASE
+
+    @classmethod
+    def menu_list(cls, limit: int, cursor: str | None) -> str:
+        return cls.MENU_LIST.format(limit=limit, cursor=cursor or '')
+
+    @classmethod
+    def menu(cls, menu_id) -> str:
+        return cls.MENU.format(menu_id=menu_id)
+
+    @classmethod
+    def submenu_list(cls, menu_id, limit: int, cursor: str | None) -> str:
+        return cls.SUBMENU_LIST.format(menu_id=menu_id, limit=limit, cursor=cursor or '')
+
+    @classmethod
+    def submenu(cls, menu_id, submenu_id) -> str:
+        return cls.SUBMENU.format(menu_id=menu_id, submenu_id=submenu_id)
+
+    @classmethod
+    def dish_list(cls, menu_id, submenu_id, limit: int, cursor: str | None) -> str:
+        return cls.DISH_LIST.format(menu_id=menu_id, submenu_id=submenu_id, limit=limit, cursor=cursor or '')
+
+    @classmethod
+    def dish(cls, menu_id, submenu_id, dish_id) -> str:
+        return cls.DISH.format(menu_id=menu_id, submenu_id=submenu_id, dish_id=dish_id)
+
+    @classmethod
+    def warmup(cls, epoch: int) -> str:
+        return cls.WARMUP.format(epoch=epoch)
+
+    @classmethod
+    def recently_bumped(cls, counter: str) -> str:
+        return cls.RECENTLY_BUMPED.format(counter=counter)
+
+    @classmethod
+    def generation(cls, key: str) -> str:
+        """
+        Returns the generation counter of the key: the counter of the whole base, of the menu list
+        or of the menu tree of the key
+        """
+        prefix = key.split(':', 2)
+        if prefix[0] == cls.BASE:
+            return cls.BASE_GENERATION
+        if prefix[0] == 'menus':
+            return cls.MENU_LIST_GENERATION
+        return 'gen:' + ':'.join(prefix[:2])
+
+    @staticmethod
+    def versioned(key: str, epoch: int, generation: int) -> str:
+        return f'{key}@{ENTRY_FORMAT}.{epoch}.{generation}'
+
+
+# Generation counters bumped by a write, by entity and action. Counts of submenus and dishes are shown
+# in the menu list, so creating and deleting them bumps the menu list too. Every write changes the whole base.
+GENERATION_MAP: dict[tuple[str, str], tuple[str, ...]] = {
+    ('menu', 'create'): (CacheKey.BASE_GENERATION, CacheKey.MENU_LIST_GENERATION),
+    ('menu', 'update'): (CacheKey.BASE_GENERATION, CacheKey.MENU_LIST_GENERATION, CacheKey.MENU_TREE_GENERATION),
+    ('menu', 'delete'): (CacheKey.BASE_GENERATION, CacheKey.MENU_LIST_GENERATION, CacheKey.MENU_TREE_GENERATION),
+    ('submenu', 'create'): (CacheKey.BASE_GENERATION, CacheKey.MENU_LIST_GENERATION, CacheKey.MENU_TREE_GENERATION),
+    ('submenu', 'update'): (CacheKey.BASE_GENERATION, CacheKey.MENU_TREE_GENERATION),
+    ('submenu', 'delete'): (CacheKey.BASE_GENERATION, CacheKey.MENU_LIST_GENERATION, CacheKey.MENU_TREE_GENERATION),
+    ('dish', 'create'): (CacheKey.BASE_GENERATION, CacheKey.MENU_LIST_GENERATION, CacheKey.MENU_TREE_GENERATION),
+    ('dish', 'update'): (CacheKey.BASE_GENERATION, CacheKey.MENU_TREE_GENERATION),
+    ('dish', 'delete'): (CacheKey.BASE_GENERATION, CacheKey.MENU_LIST_GENERATION, CacheKey.MENU_TREE_GENERATION),
+}
+
+# Bumps the generation counters of a batch of outbox events and notifies the other workers in one atomic call.
+# Every counter remembers the newest event applied to it, so a write knows whether it is still the newest one
+# of its counter whatever order the dispatchers of the workers run in.
+# A bumped counter is marked as recently bumped for DB_PRIMARY_PIN_SECONDS.
+# KEYS: the epoch, GENERATION_EVENTS, the counters and their RECENTLY_BUMPED markers. ARGV: the channel,
+# the message, DB_PRIMARY_PIN_SECONDS and, for every counter, the newest event of the batch touching it
+# and 1 to bump the counter or 0 to only read it.
+# Returns the epoch, then the generation and the newest event of every counter
+BUMP_GENERATIONS = """
+local result = {tonumber(redis.call('GET', KEYS[1]) or '0')}
+local bumped = false
+local counters = (#KEYS - 2) / 2
+for i = 3, counters + 2 do
+    local event, generation = tonumber(ARGV[2 * i - 2]), nil
+    if ARGV[2 * i - 1] == '1' then
+        redis.call('SET', KEYS[i + counters], 1, 'EX', ARGV[3])
+        generation, bumped = redis.call('INCR', KEYS[i]), true
+    else
+        generation = tonumber(redis.call('GET', KEYS[i]) or '0')
+    end
+    local newest = tonumber(redis.call('HGET', KEYS[2], KEYS[i]) or '0')
+    if event > newest then
+        redis.call('HSET', KEYS[2], KEYS[i], event)
+        newest = event
+    end
+    table.insert(result, generation)
+    table.insert(result, newest)
+end
+if bumped then
+    redis.call('PUBLISH', ARGV[1], ARGV[2])
+end
+return result
+"""
+
+
+def _encode_model(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    raise TypeError
+
+
+def dumps(value) -> bytes:
+    """
+    Serializes response models, or lists of them, to compact JSON bytes
+    """
+    return orjson.dumps(value, default=_encode_model)
+
+
+def loads(value: bytes):
+    return orjson.loads(value)
 
 
 class RedisClient:
+    """
+    Two-tier cache: the local cache of the worker in front of Redis. Every entry is fresh for the TTL of its
+    entity type and then may still be served stale for CACHE_*_STALE_TTL while one background load refreshes it.
+    Keys passed to the public methods are resolved to the current generation of their menu tree
+    """
+
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """
+        Returns the cached entry, fresh or stale, or None if the versioned key is not cached
+        """
+        entry = local_cache.get(key)
+        if entry is not None:
+            metrics.increment('cache_l1_hits')
+            return entry
+        metrics.increment('cache_l1_misses')
+        value = await redis_client.get(key)
+        if value is None:
+            metrics.increment('cache_l2_misses')
+            return None
+        metrics.increment('cache_l2_hits')
+        entry = CacheEntry.unpack(value)
+        local_cache.set(key, entry)
+        return entry
+
+    async def set_cache(self, key: str, value: bytes | Page, entity: str) -> CacheEntry:
+        """
+        Caches the JSON bytes under the versioned key with the TTL of the entity type: 'menu', 'submenu' or 'dish'
+        """
+        entry, expire = self.__new_entry(value, entity)
+        local_cache.set(key, entry)
+        await redis_client.set(key, entry.pack(), ex=expire)
+        return entry
+
+    @staticmethod
+    async def read_generations(counters: list[str]) -> dict[str, int]:
+        """
+        Reads the epoch and the generation counters from Redis, past the local cache that may lag behind them
+
+        :param counters: generation counters
+        :return: the epoch and the counters by key
+        """
+        counters = [CacheKey.EPOCH, *counters]
+        generations = await redis_client.mget(counters)
+        return {counter: int(generation or 0) for counter, generation in zip(counters, generations)}
+
+    async def set_many(self, values: list[tuple[str, bytes | Page, str]], generations: dict[str, int]) -> None:
+        """
+        Caches many values loaded from the database in Redis in one pipelined round trip. The local cache is left
+        to fill on reads. Nothing is cached if a counter read before the load has been bumped since: the values
+        may predate a write whose invalidation has already been applied
+
+        :param values: key, JSON bytes or page and entity type of every value
+        :param generations: the epoch and the counters read with read_generations before the values were loaded
+        :return: None
+        """
+        current = await self.read_generations([*generations.keys() - {CacheKey.EPOCH},
+                                               *{CacheKey.generation(key) for key, _, _ in values}])
+        if any(current[counter] != generation for counter, generation in generations.items()):
+            metrics.increment('cache_set_many_skipped')
+            return
+        await self.__set_versioned([(CacheKey.versioned(key, current[CacheKey.EPOCH],
+                                                        current[CacheKey.generation(key)]), value, entity)
+                                    for key, value, entity in values])
+
+    async def __set_versioned(self, values: list[tuple[str, bytes | Page, str]]) -> None:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key, value, entity in values:
+                entry, expire = self.__new_entry(value, entity)
+                pipe.set(key, entry.pack(), ex=expire)
+            await pipe.execute()
+
+    @staticmethod
+    async def __versioned(keys: list[str]) -> list[str]:
+        """
+        Resolves the keys to their current generation. Generations are kept in the local cache and
+        evicted through the invalidation channel when bumped; the missing ones are read with one MGET
+        """
+        counters = {CacheKey.EPOCH: None, **{CacheKey.generation(key): None for key in keys}}
+        for counter in counters:
+            counters[counter] = local_cache.get(counter)
+        missing = [counter for counter, generation in counters.items() if generation is None]
+        if missing:
+            for counter, generation in zip(missing, await redis_client.mget(missing)):
+                counters[counter] = int(generation or 0)
+                local_cache.set(counter, counters[counter])
+        return [CacheKey.versioned(key, counters[CacheKey.EPOCH], counters[CacheKey.generation(key)])
+                for key in keys]
+
+    @staticmethod
+    def __new_entry(value: bytes | Page, entity: str) -> tuple[CacheEntry, int]:
+        """
+        Returns the entry fresh for the TTL of the entity type and the expiration of its Redis key in seconds
+        """
+        ttl, stale_ttl = settings.cache_ttl(entity)
+        return CacheEntry.create(value, ttl), math.ceil(ttl + stale_ttl)
+
+    async def get_or_load(self, key: str, entity: str, repository: R, loader: Loader[R]) -> CacheEntry:
+        """
+        Returns the cached value or loads and caches it. Concurrent misses of the same key in the worker
+        await one load instead of querying the database each, a request reading from the primary only awaits
+        a load reading from the primary. A stale value is returned at once and refreshed in the background
+
+        :param key: cache key
+        :param entity: entity type of the value, selects its TTLs
+        :param repository: repository of the request, passed to the loader on a miss
+        :param loader: coroutine function returning the serialized value or page from the repository
+        :return: cache entry with the JSON bytes and their ETag
+        """
+        counter = CacheKey.generation(key)
+        (key,) = await self.__versioned([key])
+        entry = await self.get_entry(key)
+        if entry is not None:
+            if entry.is_stale:
+                metrics.increment('cache_stale_hits')
+                self.__refresh(key, entity, repository, loader)
+            return entry
+        repository = await self.__primary_after_bump(repository, {counter})
+        flight = key if repository.read_session is repository.session else key + REPLICA_LOAD
+        load = in_flight.get(key) or in_flight.get(flight)
+        if load is None:
+            # the value may have been cached by a load finished while Redis was being asked
+            entry = await self.__recheck(key)
+            if entry is not None:
+                return entry
+            load = in_flight.get(key) or in_flight.get(flight)
+        if load is None:
+            load = self.__start_load(key, entity, lambda: loader(repository), flight)
+        else:
+            metrics.increment('cache_coalesced_loads')
+        return await asyncio.shield(load)
+
     @staticmethod
-    def generate_key(prefix, body):
-        key = f'{prefix}:{body}'
-        return key
-
-    def get_cache(self, prefix, body):
-        key = self.generate_key(prefix, body)
-        value = redis_client.get(key)
-        return pickle.loads(value) if value else []
-
-    async def set_cache(self, prefix, body, value):
-        key = self.generate_key(prefix, body)
-        redis_client.set(key, pickle.dumps(value))
-
-    async def clear_cache(self, prefix, body):
-        key = self.generate_key(prefix, body)
-        redis_client.delete(key)
+    async def __recheck(key: str) -> CacheEntry | None:
+        """
+        Looks a missed key up again before loading it. Every value loaded by the worker is in the local cache,
+        without the local cache it is read from Redis again
+        """
+        if local_cache.enabled:
+            return local_cache.get(key)
+        value = await redis_client.get(key)
+        return CacheEntry.unpack(value) if value is not None else None
+
+    async def get_or_load_many(self, keys: list[str], entity: str, repository: R,
+                               loader: ManyLoader[R]) -> list[CacheEntry | None]:
+        """
+        Returns the entries of many keys. The keys missing in the local cache are read with one MGET, the keys
+        missing in Redis or stale are loaded with one call of the loader and cached in one pipelined round trip
+
+        :param keys: cache keys
+        :param entity: entity type of the values, selects their TTLs
+        :param repository: repository of the request, passed to the loader
+        :param loader: coroutine function taking the repository and the positions of the keys to load
+                       and returning the JSON bytes of the values it found by position
+        :return: entry of every key, None for the values the loader did not find
+        """
+        counters = {CacheKey.generation(key) for key in keys}
+        keys = await self.__versioned(keys)
+        entries: list[CacheEntry | None] = [local_cache.get(key) for key in keys]
+        missing = [position for position, entry in enumerate(entries) if entry is None]
+        metrics.increment('cache_l1_hits', len(keys) - len(missing))
+        metrics.increment('cache_l1_misses', len(missing))
+        if missing:
+            for position, value in zip(missing, await redis_client.mget([keys[position] for position in missing])):
+                if value is not None:
+                    entries[position] = CacheEntry.unpack(value)
+                    local_cache.set(keys[position], entries[position])
+            found = sum(entries[position] is not None for position in missing)
+            metrics.increment('cache_l2_hits', found)
+            metrics.increment('cache_l2_misses', len(missing) - found)
+        to_load = [position for position, entry in enumerate(entries) if entry is None or entry.is_stale]
+        if to_load:
+            metrics.increment('cache_loads')
+            loaded = await loader(await self.__primary_after_bump(repository, counters), to_load)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for position in to_load:
+                    entries[position] = None
+                    if position in loaded:
+                        entries[position], expire = self.__new_entry(loaded[position], entity)
+                        local_cache.set(keys[position], entries[position])
+                        pipe.set(keys[position], entries[position].pack(), ex=expire)
+                await pipe.execute()
+        return entries
+
+    @staticmethod
+    async def __primary_after_bump(repository: R, counters: set[str]) -> R:
+        """
+        Returns a repository reading from the primary instead of the replica if any of the counters was bumped
+        within DB_PRIMARY_PIN_SECONDS. The replica may not have the write yet and the value would be cached under
+        the new generation, served even to the writer pinned to the primary
+        """
+        if repository.read_session is repository.session:
+            return repository
+        if not await redis_client.exists(*(CacheKey.recently_bumped(counter) for counter in counters)):
+            return repository
+        return type(repository)(repository.session)
+
+    def __refresh(self, key: str, entity: str, repository: R, loader: Loader[R]) -> None:
+        """
+        Starts a background load of a stale key unless the key is already being loaded. The request session
+        is closed once the response is sent, so the refresh runs the loader on a new repository with its own session
+        """
+        if key in in_flight or key + REPLICA_LOAD in in_flight:
+            return
+
+        async def load_detached() -> bytes | Page:
+            async with async_session_maker() as session:
+                return await loader(type(repository)(session))
+
+        metrics.increment('cache_refreshes')
+        self.__start_load(key, entity, load_detached).add_done_callback(_log_failed_refresh)
+
+    def __start_load(self, key: str, entity: str, load: Callable[[], Awaitable[bytes | Page]],
+                     flight: str | None = None) -> asyncio.Task:
+        task = asyncio.create_task(self.__load(key, entity, load))
+        flight = flight or key
+        in_flight[flight] = task
+        task.add_done_callback(lambda _: in_flight.pop(flight, None))
+        return task
+
+    async def __load(self, key: str, entity: str, load: Callable[[], Awaitable[bytes | Page]]) -> CacheEntry:
+        """
+        Runs the load and caches its result. With CACHE_LOCK_ENABLED a short Redis lock lets only one
+        worker run the load, the others wait for the value to appear in Redis
+        """
+        lock = f'lock:{key}'
+        locked = False
+        if settings.CACHE_LOCK_ENABLED:
+            locked = await redis_client.set(lock, 1, nx=True, px=int(settings.CACHE_LOCK_TIMEOUT * 1000))
+            if not locked:
+                entry = await self.__wait_for(key)
+                if entry is not None:
+                    return entry
+        metrics.increment('cache_loads')
+        try:
+            return await self.set_cache(key, await load(), entity)
+        finally:
+            if locked:
+                await redis_client.delete(lock)
+
+    @staticmethod
+    async def __wait_for(key: str) -> CacheEntry | None:
+        """
+        Polls Redis for a fresh value loaded by another worker until the lock timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.CACHE_LOCK_TIMEOUT
+        while loop.time() < deadline:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+            value = await redis_client.get(key)
+            if value is not None and not (entry := CacheEntry.unpack(value)).is_stale:
+                local_cache.set(key, entry)
+                return entry
+        return None
+
+    async def invalidate(self, events: Iterable[tuple[int, str, str, dict]],
+                         values: Iterable[tuple[str, bytes, str]] = (), written: Iterable[int] = ()) -> None:
+        """
+        Bumps the generation counters affected by the writes according to GENERATION_MAP and caches the written
+        values under the new generations. The counters are bumped and the other workers notified in one atomic
+        call, the keys of the old generations expire with their TTL. A value is cached only if the newest event
+        applied to its counter is the newest event of its write, under the generation that event produced,
+        so it can not override a later write dispatched by another worker
+
+        :param events: id of the outbox event, entity ('menu', 'submenu' or 'dish'), action ('create', 'update'
+                       or 'delete') and the ids of the written entity: menu_id, submenu_id and dish_id
+        :param values: key, JSON bytes and entity type of every value to cache after the bump
+        :param written: ids of the events of the write the values come from
+        :return: None
+        """
+        newest_events: dict[str, int] = {}
+        for event_id, entity, action, ids in events:
+            for template in GENERATION_MAP[(entity, action)]:
+                counter = template.format(**ids)
+                newest_events[counter] = max(newest_events.get(counter, 0), event_id)
+        bumped = set(newest_events)
+        values, written_event = list(values), max(written, default=0)
+        for key, _, _ in values:
+            newest_events.setdefault(CacheKey.generation(key), written_event)
+        if not newest_events:
+            return
+        counters = list(newest_events)
+        epoch, *result = await redis_client.eval(
+            BUMP_GENERATIONS, 2 * len(counters) + 2, CacheKey.EPOCH, CacheKey.GENERATION_EVENTS, *counters,
+            *(CacheKey.recently_bumped(counter) for counter in counters),
+            settings.CACHE_INVALIDATION_CHANNEL, dumps([counter for counter in counters if counter in bumped]),
+            settings.DB_PRIMARY_PIN_SECONDS,
+            *(argument for counter in counters for argument in (newest_events[counter], int(counter in bumped))))
+        generations = dict(zip(counters, zip(result[::2], result[1::2])))
+        for counter in bumped:
+            local_cache.set(counter, generations[counter][0])
+        written_values = []
+        for key, value, entity in values:
+            generation, newest_event = generations[CacheKey.generation(key)]
+            if written_event and newest_event == written_event:
+                written_values.append((CacheKey.versioned(key, epoch, generation), value, entity))
+        await self.__set_versioned(written_values)
+
+    async def flush(self) -> None:
+        """
+        Drops the whole cache of every worker by bumping the epoch that every key embeds. Unlike FLUSHDB it
+        keeps the generation counters, so a load finished after the flush can not write a key that becomes
+        current again
+
+        :return: None
+        """
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.incr(CacheKey.EPOCH)
+            pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, dumps(['*']))
+            await pipe.execute()
+        local_cache.clear()
@@ -0,0 +1,58 @@
+import hashlib
+import struct
+import time
+from dataclasses import dataclass
+from typing import NamedTuple
+
+HEADER = struct.Struct('>d16sH')
+# Part of every stored key, changed together with HEADER so entries of the old layout are never unpacked
+ENTRY_FORMAT = 3
+
+
+class Page(NamedTuple):
+    """
+    Serialized page of a list together with the cursor of the next page, empty on the last page
+    """
+    body: bytes
+    next_cursor: str
+
+
+@dataclass(frozen=True, slots=True)
+class CacheEntry:
+    """
+    Cached JSON body with the time it stays fresh until and the hash of the body. In Redis it is stored as
+    a fixed-size header and the next page cursor of a list followed by the body, so the body is never re-encoded
+    and never hashed again
+    """
+    body: bytes
+    fresh_until: float
+    digest: bytes
+    next_cursor: str = ''
+
+    @classmethod
+    def create(cls, value: bytes | Page, ttl: float) -> 'CacheEntry':
+        body, next_cursor = value if isinstance(value, Page) else (value, '')
+        return cls(body=body, fresh_until=time.time() + ttl, digest=hashlib.blake2b(body, digest_size=16).digest(),
+                   next_cursor=next_cursor)
+
+    @property
+    def is_stale(self) -> bool:
+        return self.fresh_until < time.time()
+
+    @property
+    def etag(self) -> str:
+        """
+        Strong entity tag of the body
+        """
+        return f'"{self.digest.hex()}"'
+
+    def pack(self) -> bytes:
+        next_cursor = self.next_cursor.encode()
+        return HEADER.pack(self.fresh_until, self.digest, len(next_cursor)) + next_cursor + self.body
+
+    @classmethod
+    def unpack(cls, value: bytes) -> 'CacheEntry':
+        fresh_until, digest, cursor_size = HEADER.unpack_from(value)
+        body_start = HEADER.size + cursor_size
+        return cls(body=value[body_start:], fresh_until=fresh_until, digest=digest,
+                   next_cursor=value[HEADER.size:body_start].decode())
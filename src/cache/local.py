@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with a TTL for every entry. It is not shared between workers:
+    other workers evict their entries through the invalidation channel
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        """
+        Evicts the keys. Keys ending with '*' are patterns and evict every matching entry
+        """
+        for key in keys:
+            if key.endswith('*'):
+                for matched in [entry for entry in self._entries if fnmatchcase(entry, key)]:
+                    del self._entries[matched]
+            else:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
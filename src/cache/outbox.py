@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import Iterable
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import metrics
+from src.cache.client import RedisClient
+from src.config import settings
+from src.database.db import async_session_maker
+from src.database.models import CacheOutbox
+
+logger = logging.getLogger(__name__)
+
+FLUSH = 'flush'
+# Key of Session.info listing the ids of the events written by the session
+WRITTEN_EVENTS = 'cache_outbox_events'
+
+
+async def add_invalidation(session: AsyncSession, entity: str, action: str, **ids) -> None:
+    """
+    Writes the invalidation event in the transaction of the session, so it is committed together with the change.
+    Action 'flush' drops the whole cache. The id of the event is kept in the session, see written_events
+
+    :param session: session of the write
+    :param entity: 'menu', 'submenu' or 'dish'
+    :param action: 'create', 'update', 'delete' or 'flush'
+    :param ids: menu_id, submenu_id and dish_id of the written entity
+    :return: None
+    """
+    stmt = insert(CacheOutbox).values(entity=entity, action=action,
+                                      ids={name: str(value) for name, value in ids.items()}).returning(CacheOutbox.id)
+    session.info.setdefault(WRITTEN_EVENTS, []).append(await session.scalar(stmt))
+
+
+def written_events(session: AsyncSession) -> list[int]:
+    """
+    Returns the ids of the invalidation events written by the session
+
+    :param session: session of the write
+    :return: list of event ids
+    """
+    return list(session.info.get(WRITTEN_EVENTS, []))
+
+
+async def dispatch_outbox(values: Iterable[tuple[str, bytes, str]] = (), written: Iterable[int] = ()) -> int:
+    """
+    Applies one batch of committed events to the cache and deletes them. The events are deleted in the
+    transaction that locked them, so they stay in the outbox if the cache is not reachable.
+    Events locked by another dispatcher are skipped. The values of a write are cached only by the batch
+    holding the events of the write, otherwise they are left to the next read
+
+    :param values: key, JSON bytes and entity type of every value to cache after the eviction
+    :param written: ids of the events of the write the values come from
+    :return: number of dispatched events
+    """
+    cache = RedisClient()
+    async with async_session_maker() as session, session.begin():
+        events = (await session.scalars(select(CacheOutbox)
+                                        .order_by(CacheOutbox.id)
+                                        .limit(settings.CACHE_OUTBOX_BATCH_SIZE)
+                                        .with_for_update(skip_locked=True))).all()
+        if any(event.action == FLUSH for event in events):
+            await cache.flush()
+        written = set(written)
+        if not written or not written <= {event.id for event in events}:
+            values = ()
+        await cache.invalidate([(event.id, event.entity, event.action, event.ids) for event in events
+                                if event.action != FLUSH], values, written)
+        if events:
+            await session.execute(delete(CacheOutbox).where(CacheOutbox.id.in_([event.id for event in events])))
+    metrics.increment('cache_outbox_dispatched', len(events))
+    return len(events)
+
+
+async def dispatch_after_write(values: Iterable[tuple[str, bytes, str]] = (), written: Iterable[int] = ()) -> None:
+    """
+    Dispatches the outbox right after a write. A failure is only logged: the events are retried by the
+    dispatcher of the worker
+
+    :param values: key, JSON bytes and entity type of every written value to cache
+    :param written: ids of the events of the write, see written_events
+    :return: None
+    """
+    try:
+        await dispatch_outbox(values, written)
+    except Exception:
+        metrics.increment('cache_outbox_failures')
+        logger.warning('Cache outbox dispatch failed, the events are left to the dispatcher', exc_info=True)
+
+
+async def run_outbox_dispatcher() -> None:
+    """
+    Drains the outbox for the whole life of the worker, polling every CACHE_OUTBOX_POLL_INTERVAL seconds.
+    Failed batches are retried with an exponential backoff up to CACHE_OUTBOX_MAX_RETRY_DELAY seconds
+
+    :return: None
+    """
+    failures = 0
+    while True:
+        try:
+            while await dispatch_outbox() == settings.CACHE_OUTBOX_BATCH_SIZE:
+                pass
+            failures = 0
+            await asyncio.sleep(settings.CACHE_OUTBOX_POLL_INTERVAL)
+        except Exception:
+            failures += 1
+            metrics.increment('cache_outbox_failures')
+            logger.warning('Cache outbox dispatch failed %d times in a row', failures, exc_info=True)
+            await asyncio.sleep(min(settings.CACHE_OUTBOX_POLL_INTERVAL * 2 ** failures,
+                                    settings.CACHE_OUTBOX_MAX_RETRY_DELAY))
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import math
+import time
+import uuid
+from contextlib import suppress
+from typing import Awaitable, Callable, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy import RowMapping
+
+from src import metrics
+from src.cache.client import CacheKey, RedisClient, dumps, redis_client
+from src.cache.entry import Page
+from src.config import settings
+from src.database.db import async_session_maker
+from src.menu_management.pagination import decode_cursor, split_page
+from src.menu_management.repository.dish_repository import DishRepository
+from src.menu_management.repository.menu_repository import MenuRepository
+from src.menu_management.repository.submenu_repository import SubmenuRepository
+from src.menu_management.schemas.schemas import (
+    DishResponse,
+    MenuResponse,
+    SubmenuResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar('M', bound=BaseModel)
+
+
+async def warm_up_cache() -> None:
+    """
+    Loads the menu list and every menu tree into the cache on startup, so a fresh worker does not send
+    its first requests to the database. Lists are cached in pages of PAGE_SIZE_DEFAULT, as clients get them
+    without a limit. Menu trees are loaded by at most CACHE_WARMUP_CONCURRENCY sessions at once and every tree
+    is written to Redis in one pipeline, unless a write bumped its generation while it was fetched.
+    The cache is shared, so only the worker that sets the warm-up marker of the cache epoch loads it,
+    for at most CACHE_WARMUP_TIMEOUT, and the other workers start at once.
+    The marker lives as long as the warmed values stay fresh. A failed warm-up only leaves the cache cold
+
+    :return: None
+    """
+    started = time.perf_counter()
+    marker = None
+    try:
+        marker = CacheKey.warmup(int(await redis_client.get(CacheKey.EPOCH) or 0))
+        if not await redis_client.set(marker, 'running', nx=True, ex=math.ceil(settings.CACHE_WARMUP_TIMEOUT)):
+            logger.info('Cache warm-up is skipped, %s is set by another worker', marker)
+            return
+        menus = await asyncio.wait_for(_warm_up(RedisClient()), settings.CACHE_WARMUP_TIMEOUT)
+        fresh = min(settings.cache_ttl(entity)[0] for entity in ('menu', 'submenu', 'dish'))
+        await redis_client.set(marker, 'done', ex=math.ceil(fresh))
+    except Exception:
+        logger.exception('Cache warm-up failed')
+        if marker is not None:
+            with suppress(Exception):
+                await redis_client.delete(marker)
+        return
+    elapsed = time.perf_counter() - started
+    metrics.record('cache_warmup_seconds', elapsed)
+    logger.info('Cache warmed up with %d menus in %.3f s', menus, elapsed)
+
+
+async def _warm_up(cache: RedisClient) -> int:
+    """
+    Caches the menu list and every menu tree
+
+    :return: number of menus
+    """
+    # every write changing a menu also bumps the menu list, so the list generation guards the menus too
+    generations = await cache.read_generations([CacheKey.MENU_LIST_GENERATION])
+    async with async_session_maker() as session:
+        menu_repository = MenuRepository(session)
+        values, menus = await _pages(lambda limit, after: menu_repository.get_menu_list(limit, after),
+                                     MenuResponse, CacheKey.menu_list, 'menu')
+    await cache.set_many([*values, *((CacheKey.menu(menu.id), dumps(menu), 'menu') for menu in menus)], generations)
+    semaphore = asyncio.Semaphore(settings.CACHE_WARMUP_CONCURRENCY)
+    await asyncio.gather(*(_warm_up_menu(cache, semaphore, menu.id) for menu in menus))
+    return len(menus)
+
+
+async def _warm_up_menu(cache: RedisClient, semaphore: asyncio.Semaphore, menu_id) -> None:
+    """
+    Caches the submenu list of the menu, its submenus and their dish lists and dishes
+    """
+    async with semaphore, async_session_maker() as session:
+        generations = await cache.read_generations([CacheKey.generation(CacheKey.menu(menu_id))])
+        submenu_repository, dish_repository = SubmenuRepository(session), DishRepository(session)
+        values, submenus = await _pages(
+            lambda limit, after: submenu_repository.get_list_submenus(menu_id, limit, after),
+            SubmenuResponse, lambda limit, cursor: CacheKey.submenu_list(menu_id, limit, cursor), 'submenu')
+        for submenu in submenus:
+            dish_values, dishes = await _pages(
+                lambda limit, after: dish_repository.get_dish_list(submenu.id, limit, after),
+                DishResponse, lambda limit, cursor: CacheKey.dish_list(menu_id, submenu.id, limit, cursor), 'dish')
+            values += [(CacheKey.submenu(menu_id, submenu.id), dumps(submenu), 'submenu'), *dish_values,
+                       *((CacheKey.dish(menu_id, submenu.id, dish.id), dumps(dish), 'dish') for dish in dishes)]
+        await cache.set_many(values, generations)
+
+
+async def _pages(fetch: Callable[[int, uuid.UUID | None], Awaitable[list[RowMapping]]], model: type[M],
+                 key: Callable[[int, str | None], str], entity: str) -> tuple[list[tuple[str, Page, str]], list[M]]:
+    """
+    Fetches the whole list page by page as the list routes do
+
+    :return: the cache values of the pages and all the items of the list
+    """
+    values, items, cursor = [], [], ''
+    while True:
+        rows, next_cursor = split_page(await fetch(settings.PAGE_SIZE_DEFAULT, decode_cursor(cursor)),
+                                       settings.PAGE_SIZE_DEFAULT)
+        page = [model(**row) for row in rows]
+        values.append((key(settings.PAGE_SIZE_DEFAULT, cursor), Page(dumps(page), next_cursor), entity))
+        items += page
+        if not next_cursor:
+            return values, items
+        cursor = next_cursor
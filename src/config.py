@@ -11,14 +11,82 @@ class Settings(BaseSettings):
     DB_PORT: int
     DB_USER: str
     DB_PASS: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Prepared statements cached per connection, 0 behind a transaction pooler like PgBouncer
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Read replica with the credentials and the database name of the primary, reads go to the primary if not set
+    DB_REPLICA_HOST: str | None = None
+    DB_REPLICA_PORT: int | None = None
+    # Reads go to the primary this long after a write, must be longer than the replication lag
+    DB_PRIMARY_PIN_SECONDS: int = 5
 
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_MAX_CONNECTIONS: int = 50
+
+    CACHE_L1_ENABLED: bool = True
+    CACHE_L1_MAXSIZE: int = 1024
+    CACHE_L1_TTL: float = 5.0
+    CACHE_INVALIDATION_CHANNEL: str = 'cache:invalidate'
+    CACHE_LOCK_ENABLED: bool = False
+    CACHE_LOCK_TIMEOUT: float = 5.0
+    CACHE_LOCK_POLL_INTERVAL: float = 0.05
+
+    CACHE_MENU_TTL: float = 300
+    CACHE_MENU_STALE_TTL: float = 60
+    CACHE_SUBMENU_TTL: float = 300
+    CACHE_SUBMENU_STALE_TTL: float = 60
+    CACHE_DISH_TTL: float = 300
+    CACHE_DISH_STALE_TTL: float = 60
+
+    CACHE_WARMUP_ENABLED: bool = True
+    CACHE_WARMUP_CONCURRENCY: int = 4
+    # Seconds one worker may spend warming the cache up, the other workers start without waiting for it
+    CACHE_WARMUP_TIMEOUT: float = 60.0
+
+    CACHE_OUTBOX_BATCH_SIZE: int = 100
+    CACHE_OUTBOX_POLL_INTERVAL: float = 1.0
+    CACHE_OUTBOX_MAX_RETRY_DELAY: float = 30.0
+
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 1000
+
+    # Cache-Control of the GET routes. 'no-cache' lets clients keep responses but revalidate them by ETag
+    CACHE_CONTROL_MENU_LIST: str = 'no-cache'
+    CACHE_CONTROL_MENU: str = 'no-cache'
+    CACHE_CONTROL_SUBMENU_LIST: str = 'no-cache'
+    CACHE_CONTROL_SUBMENU: str = 'no-cache'
+    CACHE_CONTROL_DISH_LIST: str = 'no-cache'
+    CACHE_CONTROL_DISH: str = 'no-cache'
+    CACHE_CONTROL_BASE: str = 'no-cache'
+
+    def cache_ttl(self, entity: str) -> tuple[float, float]:
+        """
+        Returns how long cached values of the entity type stay fresh and how long they may be served stale after
+        """
+        return getattr(self, f'CACHE_{entity.upper()}_TTL'), getattr(self, f'CACHE_{entity.upper()}_STALE_TTL')
 
     @property
     def db_url(self) -> str:
-        return (f'postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:'
-                f'{self.DB_PORT}/{self.DB_NAME}?async_fallback=True')
+        return f'postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}'
+
+    @property
+    def replica_db_url(self) -> str | None:
+        if not self.DB_REPLICA_HOST:
+            return None
+        return (f'postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_REPLICA_HOST}:'
+                f'{self.DB_REPLICA_PORT or self.DB_PORT}/{self.DB_NAME}')
+
+    @property
+    def sync_db_url(self) -> str:
+        """
+        URL for the synchronous migrations of alembic
+        """
+        return f'postgresql+psycopg2://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}'
 
 
 settings = Settings()
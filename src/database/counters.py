@@ -0,0 +1,54 @@
+"""
+Recomputes the submenu and dish counters of menus and submenus from the rows they count.
+
+The repositories keep the counters in the transaction of every write, so a reconciliation only finds drift
+left by writes that went around them, like manual SQL. The cache is dropped if any counter was wrong.
+
+Usage (PostgreSQL must be reachable with the settings from .env):
+    python -m src.database.counters
+"""
+import asyncio
+
+from sqlalchemy import func, select, update
+
+from src.cache.client import close_redis
+from src.cache.outbox import FLUSH, add_invalidation, dispatch_after_write
+from src.database.db import async_session_maker
+from src.database.models import Dish, Menu, Submenu
+
+
+async def reconcile_counters() -> tuple[int, int]:
+    """
+    Sets every counter to the actual number of rows in one transaction
+
+    :return: number of corrected menus and submenus
+    """
+    dishes = (select(func.count(Dish.id)).where(Dish.submenu_group == Submenu.id)
+              .correlate(Submenu).scalar_subquery())
+    submenus = (select(func.count(Submenu.id)).where(Submenu.menu_group == Menu.id)
+                .correlate(Menu).scalar_subquery())
+    menu_dishes = (select(func.coalesce(func.sum(Submenu.dishes_count), 0)).where(Submenu.menu_group == Menu.id)
+                   .correlate(Menu).scalar_subquery())
+    async with async_session_maker() as session:
+        async with session.begin():
+            # Submenus first, the dish counters of menus are summed from them
+            corrected_submenus = (await session.execute(
+                update(Submenu).where(Submenu.dishes_count != dishes).values(dishes_count=dishes))).rowcount
+            corrected_menus = (await session.execute(
+                update(Menu).where((Menu.submenus_count != submenus) | (Menu.dishes_count != menu_dishes))
+                .values(submenus_count=submenus, dishes_count=menu_dishes))).rowcount
+            if corrected_menus or corrected_submenus:
+                await add_invalidation(session, 'menu', FLUSH)
+    if corrected_menus or corrected_submenus:
+        await dispatch_after_write()
+    return corrected_menus, corrected_submenus
+
+
+async def main() -> None:
+    menus, submenus = await reconcile_counters()
+    print(f'corrected {menus} menus and {submenus} submenus')
+    await close_redis()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,14 +1,87 @@
+import time
 from typing import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Depends, Request
+from sqlalchemy import AsyncAdaptedQueuePool, PoolProxiedConnection
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
+from src import metrics
 from src.config import settings
 
+# Set on the responses to writes, the client reads from the primary while it lasts
+PRIMARY_PIN_COOKIE = 'db_primary'
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Pool of the engine recording how long every checkout waited for a connection and how many checkouts timed out
+    """
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except TimeoutError:
+            metrics.increment('db_pool_timeouts')
+            raise
+        finally:
+            metrics.observe('db_pool_checkout_seconds', time.perf_counter() - started)
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(url, poolclass=InstrumentedPool,
+                               pool_size=settings.DB_POOL_SIZE,
+                               max_overflow=settings.DB_MAX_OVERFLOW,
+                               pool_timeout=settings.DB_POOL_TIMEOUT,
+                               pool_recycle=settings.DB_POOL_RECYCLE,
+                               pool_pre_ping=settings.DB_POOL_PRE_PING,
+                               connect_args={'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+                                             'prepared_statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE})
+
+
 DATABASE_URL = settings.db_url
-engine = create_async_engine(DATABASE_URL)
+engine = _create_engine(DATABASE_URL)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+replica_engine = _create_engine(settings.replica_db_url) if settings.replica_db_url else None
+replica_session_maker = (async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+                         if replica_engine else None)
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+async def get_read_session(request: Request,
+                           session: AsyncSession = Depends(get_session)) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session of the read-only repository methods. Reads go to the replica unless there is none or the client wrote
+    within DB_PRIMARY_PIN_SECONDS, so it reads its own writes. Otherwise the primary session of the request is shared
+
+    :return: AsyncGenerator[AsyncSession, None]
+    """
+    if replica_session_maker is None or PRIMARY_PIN_COOKIE in request.cookies:
+        yield session
+        return
+    metrics.increment('db_replica_sessions')
+    async with replica_session_maker() as replica_session:
+        yield replica_session
+
+
+def pool_status() -> dict[str, int]:
+    """
+    Current connections of the pools of this worker: in use by sessions, idle and opened above pool_size.
+    The replica pool is reported under db_replica_pool_*
+    """
+    status = {}
+    for prefix, pool_engine in (('db_pool', engine), ('db_replica_pool', replica_engine)):
+        if pool_engine is not None:
+            status |= {
+                f'{prefix}_size': pool_engine.pool.size(),
+                f'{prefix}_checked_out': pool_engine.pool.checkedout(),
+                f'{prefix}_checked_in': pool_engine.pool.checkedin(),
+                f'{prefix}_overflow': max(pool_engine.pool.overflow(), 0),
+            }
+    return status
@@ -1,6 +1,8 @@
 import uuid
+from datetime import datetime
+from decimal import Decimal
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import JSON, BigInteger, ForeignKey, Index, Numeric, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -14,6 +16,9 @@ class Menu(Base):
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     title: Mapped[str] = mapped_column(nullable=False, unique=True)
     description: Mapped[str] = mapped_column(nullable=False)
+    # Maintained by the repositories in the transaction of every write, recomputed by src.database.counters
+    submenus_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default='0')
+    dishes_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default='0')
 
 
 class Submenu(Base):
@@ -23,6 +28,10 @@ class Submenu(Base):
     title: Mapped[str] = mapped_column(nullable=False, unique=True)
     description: Mapped[str] = mapped_column(nullable=False)
     menu_group: Mapped[str] = mapped_column(ForeignKey('menu.id', ondelete='CASCADE'))
+    dishes_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default='0')
+
+    # Serves the submenu list pages of a menu, the submenu counts of menus and cascade deletes of menus
+    __table_args__ = (Index('ix_submenu_menu_group_id', 'menu_group', 'id'),)
 
 
 class Dish(Base):
@@ -31,5 +40,21 @@ class Dish(Base):
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     title: Mapped[str] = mapped_column(nullable=False, unique=True)
     description: Mapped[str] = mapped_column(nullable=False)
-    price: Mapped[str] = mapped_column(nullable=False)
+    price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
     submenu_group: Mapped[str] = mapped_column(ForeignKey('submenu.id', ondelete='CASCADE'))
+
+    # Serves the dish list pages of a submenu, the dish counts with an index-only scan and cascade deletes
+    __table_args__ = (Index('ix_dish_submenu_group_id', 'submenu_group', 'id'),)
+
+
+class CacheOutbox(Base):
+    """
+    Cache invalidation events written in the transaction of the change they invalidate
+    """
+    __tablename__ = 'cache_outbox'
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(nullable=False)
+    action: Mapped[str] = mapped_column(nullable=False)
+    ids: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(nullable=False, server_default=func.now())
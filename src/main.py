@@ -1,11 +1,37 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
-from src.cache.client import redis_client
+from fastapi import FastAPI, Request
+
+from src import metrics
+from src.cache.client import close_redis, listen_invalidations, open_redis
+from src.cache.outbox import run_outbox_dispatcher
+from src.cache.warmup import warm_up_cache
+from src.config import settings
+from src.database import db
+from src.database.db import PRIMARY_PIN_COOKIE, pool_status
 from src.menu_management.routers.dish_router import dish_router
 from src.menu_management.routers.menu_router import menu_router
 from src.menu_management.routers.submenu_router import submenu_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_redis()
+    invalidation_listener = asyncio.create_task(listen_invalidations())
+    if settings.CACHE_WARMUP_ENABLED:
+        await warm_up_cache()
+    outbox_dispatcher = asyncio.create_task(run_outbox_dispatcher())
+    yield
+    for task in (outbox_dispatcher, invalidation_listener):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await close_redis()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title='Menu management',
     version='0.0.2',
     description='Приложение для работы с меню ресторана. Реализует CRUD для трех сущностей: Menu, Submenu, Dish.'
@@ -23,6 +49,18 @@ app.include_router(submenu_router)
 app.include_router(dish_router)
 
 
-@app.on_event('shutdown')
-async def on_shutdown():
-    redis_client.flushdb()
+@app.middleware('http')
+async def pin_writer_to_primary(request: Request, call_next):
+    """
+    Marks a client that has just written, so its reads go to the primary until the replica catches up
+    """
+    response = await call_next(request)
+    wrote = request.method not in ('GET', 'HEAD') and response.status_code < 400
+    if wrote and db.replica_session_maker is not None:
+        response.set_cookie(PRIMARY_PIN_COOKIE, '1', max_age=settings.DB_PRIMARY_PIN_SECONDS, httponly=True)
+    return response
+
+
+@app.get('/metrics', include_in_schema=False)
+async def get_metrics():
+    return {**metrics.snapshot(), **pool_status()}
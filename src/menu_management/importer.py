@@ -0,0 +1,169 @@
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Sequence
+
+import orjson
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from src.menu_management.schemas.schemas import ImportDish, ImportMenu, ImportSubmenu
+
+Location = tuple[int | str, ...]
+
+NDJSON_MODELS: dict[str, type[BaseModel]] = {'menu': ImportMenu, 'submenu': ImportSubmenu, 'dish': ImportDish}
+
+
+@dataclass
+class ImportRows:
+    """
+    Rows of the three tables ready for a multi-row insert, each with the location of its source in the document
+    at the same position of the locations of its entity.
+    Ids missing in the document are generated, the counters are computed from the children
+    """
+    menus: list[dict] = field(default_factory=list)
+    submenus: list[dict] = field(default_factory=list)
+    dishes: list[dict] = field(default_factory=list)
+    locations: dict[str, list[Location]] = field(
+        default_factory=lambda: {'menu': [], 'submenu': [], 'dish': []})
+
+    def add_menu(self, menu: ImportMenu, location: Location) -> dict:
+        row = {'id': menu.id or uuid.uuid4(), 'title': menu.title, 'description': menu.description,
+               'submenus_count': 0, 'dishes_count': 0}
+        self.menus.append(row)
+        self.locations['menu'].append(location)
+        return row
+
+    def add_submenu(self, menu: dict, submenu: ImportSubmenu, location: Location) -> dict:
+        row = {'id': submenu.id or uuid.uuid4(), 'title': submenu.title, 'description': submenu.description,
+               'menu_group': menu['id'], 'dishes_count': 0}
+        self.submenus.append(row)
+        self.locations['submenu'].append(location)
+        menu['submenus_count'] += 1
+        return row
+
+    def add_dish(self, menu: dict, submenu: dict, dish: ImportDish, location: Location) -> dict:
+        row = {'id': dish.id or uuid.uuid4(), 'title': dish.title, 'description': dish.description,
+               'price': dish.price, 'submenu_group': submenu['id']}
+        self.dishes.append(row)
+        self.locations['dish'].append(location)
+        submenu['dishes_count'] += 1
+        menu['dishes_count'] += 1
+        return row
+
+    def add_menu_tree(self, menu: ImportMenu, location: Location) -> dict:
+        menu_row = self.add_menu(menu, location)
+        for submenu_number, submenu in enumerate(menu.submenus):
+            self.add_submenu_tree(menu_row, submenu, location + ('submenus', submenu_number))
+        return menu_row
+
+    def add_submenu_tree(self, menu: dict, submenu: ImportSubmenu, location: Location) -> dict:
+        submenu_row = self.add_submenu(menu, submenu, location)
+        for dish_number, dish in enumerate(submenu.dishes):
+            self.add_dish(menu, submenu_row, dish, location + ('dishes', dish_number))
+        return submenu_row
+
+    def duplicates(self) -> list[dict]:
+        """
+        Reports every row repeating the id or the title of an earlier row of the same table
+        """
+        errors = []
+        for entity, rows in (('menu', self.menus), ('submenu', self.submenus), ('dish', self.dishes)):
+            for column in ('id', 'title'):
+                seen = set()
+                for row, location in zip(rows, self.locations[entity]):
+                    if row[column] in seen:
+                        errors.append({'loc': location,
+                                       'msg': f'{entity} {column} is repeated in the document'})
+                    seen.add(row[column])
+        return errors
+
+
+def rows_from_json(body: bytes) -> ImportRows:
+    """
+    Validates a JSON list of menus with nested submenus and dishes
+
+    :param body: request body
+    :return: rows of the document
+    """
+    try:
+        menus = TypeAdapter(list[ImportMenu]).validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=[{'loc': error['loc'], 'msg': error['msg']}
+                                                     for error in e.errors()])
+    rows = ImportRows()
+    for menu_number, menu in enumerate(menus):
+        rows.add_menu_tree(menu, (menu_number,))
+    return rows
+
+
+async def rows_from_ndjson(stream: AsyncIterable[bytes]) -> ImportRows:
+    """
+    Validates newline-delimited JSON in the format of the export: one line per menu, submenu and dish
+    with its 'type', every child after its parent. The parent ids of the export are optional.
+    A line may also carry its children nested as in the JSON document
+
+    :param stream: request body chunks
+    :return: rows of the document
+    """
+    rows, errors = ImportRows(), []
+    menu = submenu = None
+    line_number = 0
+    async for line in _lines(stream):
+        line_number += 1
+        if not line.strip():
+            continue
+        location = ('line', line_number)
+        try:
+            fields = orjson.loads(line)
+            model = NDJSON_MODELS.get(str(fields.get('type'))) if isinstance(fields, dict) else None
+            if model is None:
+                raise ValueError("'type' must be 'menu', 'submenu' or 'dish'")
+            item = model.model_validate(fields)
+        except ValidationError as e:
+            errors += [{'loc': location + error['loc'], 'msg': error['msg']} for error in e.errors()]
+            continue
+        except ValueError as e:
+            errors.append({'loc': location, 'msg': str(e)})
+            continue
+        if isinstance(item, ImportMenu):
+            menu, submenu = rows.add_menu_tree(item, location), None
+        elif isinstance(item, ImportSubmenu) and _is_parent(menu, fields.get('menu_id')):
+            submenu = rows.add_submenu_tree(menu, item, location)
+        elif isinstance(item, ImportDish) and _is_parent(submenu, fields.get('submenu_id')):
+            rows.add_dish(menu, submenu, item, location)
+        else:
+            errors.append({'loc': location, 'msg': f'{fields["type"]} does not follow its parent'})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return rows
+
+
+def _is_parent(parent: dict | None, parent_id: str | None) -> bool:
+    return parent is not None and (parent_id is None or parent_id == str(parent['id']))
+
+
+async def _lines(stream: AsyncIterable[bytes]) -> AsyncIterable[bytes]:
+    buffer = b''
+    async for chunk in stream:
+        *lines, buffer = (buffer + chunk).split(b'\n')
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def conflicts(rows: ImportRows, existing: dict[str, Sequence[tuple[str, uuid.UUID | str]]]) -> list[dict]:
+    """
+    Reports the rows of the document conflicting with the base
+
+    :param rows: rows of the document
+    :param existing: per entity, the column and the value of every row already in the base
+    :return: errors with the location of every conflicting row
+    """
+    errors = []
+    for entity, table in (('menu', rows.menus), ('submenu', rows.submenus), ('dish', rows.dishes)):
+        taken = set(existing[entity])
+        for row, location in zip(table, rows.locations[entity]):
+            errors += [{'loc': location, 'msg': f'{entity} {column} already exists'}
+                       for column in ('id', 'title') if (column, row[column]) in taken]
+    return errors
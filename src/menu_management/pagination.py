@@ -0,0 +1,40 @@
+import base64
+import binascii
+import uuid
+from typing import Mapping, Sequence, TypeVar
+
+from fastapi import HTTPException
+
+T = TypeVar('T', bound=Mapping)
+
+
+def encode_cursor(last_id: uuid.UUID) -> str:
+    """
+    Opaque cursor of the page after the row with last_id
+    """
+    return base64.urlsafe_b64encode(last_id.bytes).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str | None) -> uuid.UUID | None:
+    """
+    Returns the id of the last row of the previous page, None for the first page
+
+    :param cursor: cursor from the X-Next-Cursor header of the previous page
+    :return: uuid.UUID | None
+    """
+    if not cursor:
+        return None
+    try:
+        return uuid.UUID(bytes=base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail='invalid cursor')
+
+
+def split_page(rows: Sequence[T], limit: int) -> tuple[Sequence[T], str]:
+    """
+    Splits limit + 1 rows fetched in id order into the page and the cursor of the next page,
+    empty if there are no rows after the page
+    """
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1]['id'])
+    return rows, ''
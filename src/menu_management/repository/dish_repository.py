@@ -1,65 +1,188 @@
+import uuid
+from typing import Annotated
+
 from fastapi import Depends, HTTPException
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import (
+    ARRAY,
+    Numeric,
+    RowMapping,
+    String,
+    Uuid,
+    any_,
+    bindparam,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+    values,
+)
 from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_session
-from src.database.models import Dish
+from src.cache.outbox import add_invalidation
+from src.database.db import get_read_session, get_session
+from src.database.models import Dish, Menu, Submenu
 
 
 class DishRepository:
 
-    def __init__(self, session: AsyncSession = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session),
+                 read_session: Annotated[AsyncSession | None, Depends(get_read_session)] = None):
         self.session = session
+        # Replica session of the read-only methods, repositories built outside a request read from the primary
+        self.read_session = read_session or session
+
+    async def get_dish_list(self, submenu_id: str, limit: int, after: uuid.UUID | None = None) -> list[RowMapping]:
+        """
+        Returns up to limit + 1 dishes of the submenu ordered by id, starting after the dish with id after
+        """
+        stmt = select(Dish.id, Dish.title, Dish.description, Dish.price).where(Dish.submenu_group == submenu_id)
+        if after is not None:
+            stmt = stmt.where(Dish.id > after)
+        stmt = stmt.order_by(Dish.id).limit(limit + 1)
+        try:
+            result = await self.read_session.execute(stmt)
+            return list(result.mappings().fetchall())
+        except DBAPIError as e:
+            raise HTTPException(status_code=404, detail=f'{e.orig}')
 
-    async def get_dish_list(self, submenu_id: str) -> list[Dish]:
-        stmt = select(Dish).where(Dish.submenu_group == submenu_id)
+    async def get_dish(self, submenu_id: str, dish_id: str) -> RowMapping | None:
+        stmt = (select(Dish.id, Dish.title, Dish.description, Dish.price)
+                .where(Dish.id == dish_id, Dish.submenu_group == submenu_id))
         try:
-            result = await self.session.execute(stmt)
-            return list(result.scalars().fetchall())
+            dish = await self.read_session.execute(stmt)
+            return dish.mappings().first()
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
 
-    async def get_dish(self, dish_id: str) -> Dish:
-        stmt = select(Dish).where(Dish.id == dish_id).limit(1)
+    async def get_dishes(self, submenu_id: str, dish_ids: list[uuid.UUID]) -> list[RowMapping]:
+        """
+        Returns the dishes of the submenu with the given ids in one query, the ids not found are skipped
+        """
+        stmt = (select(Dish.id, Dish.title, Dish.description, Dish.price)
+                .where(Dish.submenu_group == submenu_id,
+                       Dish.id == any_(bindparam('dish_ids', dish_ids, type_=ARRAY(Uuid)))))
         try:
-            dish = await self.session.execute(stmt)
-            dish = dish.scalar()
-            return dish
+            result = await self.read_session.execute(stmt)
+            return list(result.mappings().fetchall())
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
 
-    async def add_dish(self, dish_as_dict: dict) -> Dish:
+    async def _count_dishes(self, submenu_id, delta: int) -> uuid.UUID:
+        """
+        Adds delta to the dish counters of the submenu and of its menu, in the transaction of the session
+
+        :return: id of the menu of the submenu
+        """
+        menu_id = await self.session.scalar(update(Submenu).where(Submenu.id == submenu_id)
+                                            .values(dishes_count=Submenu.dishes_count + delta)
+                                            .returning(Submenu.menu_group))
+        await self.session.execute(update(Menu).where(Menu.id == menu_id)
+                                   .values(dishes_count=Menu.dishes_count + delta))
+        return menu_id
+
+    async def add_dish(self, menu_id: str, dish_as_dict: dict) -> Dish:
         stmt = insert(Dish).values(**dish_as_dict).returning(Dish)
         try:
-            new_dish = await self.session.execute(stmt)
+            new_dish = (await self.session.execute(stmt)).scalar()
+            await self._count_dishes(new_dish.submenu_group, 1)
+            await add_invalidation(self.session, 'dish', 'create',
+                                   menu_id=menu_id, submenu_id=new_dish.submenu_group, dish_id=new_dish.id)
             await self.session.commit()
-            new_dish = new_dish.scalar()
             return new_dish
         except IntegrityError as e:
             raise HTTPException(status_code=409, detail=f'{e.orig}')
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
 
-    async def update_dish(self, dish_id: str, dish: dict) -> Dish:
-        stmt = update(Dish).where(Dish.id == dish_id).values(dish).returning(Dish)
+    async def update_dish(self, submenu_id: str, dish_id: str, dish: dict) -> RowMapping | None:
+        """
+        Patches the dish of the submenu. The menu of the invalidation is taken from the submenu row
+
+        :return: the patched dish and the id of its menu, None if the dish is not found in the submenu
+        """
+        # a Core statement, the ORM can not return the columns of the FROM table
+        stmt = (update(Dish.__table__)
+                .where(Dish.id == dish_id, Dish.submenu_group == submenu_id, Submenu.id == Dish.submenu_group)
+                .values(dish).returning(Dish.id, Dish.title, Dish.description, Dish.price,
+                                        Submenu.menu_group.label('menu_id')))
         try:
-            patched_dish = await self.session.execute(stmt)
+            patched = (await self.session.execute(stmt)).mappings().first()
+            if patched:
+                await add_invalidation(self.session, 'dish', 'update',
+                                       menu_id=patched.menu_id, submenu_id=submenu_id, dish_id=dish_id)
             await self.session.commit()
-            patched_dish = patched_dish.scalar()
-            return patched_dish
+            return patched
         except IntegrityError as e:
             raise HTTPException(status_code=409, detail=f'{e.orig}')
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
 
-    async def delete_dish(self, dish_id: str) -> dict[str, bool | str]:
-        stmt = delete(Dish).where(Dish.id == dish_id).returning(Dish)
+    async def delete_dish(self, submenu_id: str, dish_id: str) -> dict[str, bool | str]:
+        stmt = delete(Dish).where(Dish.id == dish_id, Dish.submenu_group == submenu_id).returning(Dish.id)
         try:
-            deleted_dish = await self.session.execute(stmt)
-            await self.session.commit()
-            if deleted_dish.scalar():
+            if (await self.session.execute(stmt)).first():
+                menu_id = await self._count_dishes(submenu_id, -1)
+                await add_invalidation(self.session, 'dish', 'delete',
+                                       menu_id=menu_id, submenu_id=submenu_id, dish_id=dish_id)
+                await self.session.commit()
                 return {'status': True, 'message': 'The dish has been deleted'}
             return {'status': False, 'message': 'The dish not found'}
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
+
+    async def update_dishes(self, menu_id: str, submenu_id: str, dishes: list[dict]) -> list[RowMapping]:
+        """
+        Patches many dishes of the submenu with one UPDATE ... FROM (VALUES ...) and one invalidation event.
+        Fields set to None are left as they are. Nothing is written if a dish is not found in the submenu
+
+        :param menu_id: menu of the submenu
+        :param submenu_id: submenu of the dishes
+        :param dishes: id and the new title, description and price of every dish
+        :return: patched dishes
+        """
+        patch = (values(column('id', Uuid), column('title', String), column('description', String),
+                        column('price', Numeric(10, 2)), name='patch')
+                 .data([(dish['id'], dish['title'], dish['description'], dish['price']) for dish in dishes]))
+        # a column of NULLs only comes out of VALUES as text
+        stmt = (update(Dish).where(Dish.id == patch.c.id, Dish.submenu_group == submenu_id)
+                .values(title=func.coalesce(patch.c.title, Dish.title),
+                        description=func.coalesce(patch.c.description, Dish.description),
+                        price=func.coalesce(cast(patch.c.price, Numeric(10, 2)), Dish.price))
+                .returning(Dish.id, Dish.title, Dish.description, Dish.price)
+                .execution_options(synchronize_session=False))
+        try:
+            patched = list((await self.session.execute(stmt)).mappings().fetchall())
+            if len(patched) < len(dishes):
+                await self.session.rollback()
+                raise HTTPException(status_code=404, detail='dish not found')
+            await add_invalidation(self.session, 'dish', 'update', menu_id=menu_id, submenu_id=submenu_id)
+            await self.session.commit()
+            return patched
+        except IntegrityError as e:
+            raise HTTPException(status_code=409, detail=f'{e.orig}')
+        except DBAPIError as e:
+            raise HTTPException(status_code=404, detail=f'{e.orig}')
+
+    async def delete_dishes(self, menu_id: str, submenu_id: str, dish_ids: list[uuid.UUID]) -> int:
+        """
+        Deletes the dishes of the submenu with the given ids with one DELETE and one invalidation event
+
+        :return: number of deleted dishes
+        """
+        stmt = (delete(Dish)
+                .where(Dish.submenu_group == submenu_id,
+                       Dish.id == any_(bindparam('dish_ids', dish_ids, type_=ARRAY(Uuid))))
+                .returning(Dish.id))
+        try:
+            deleted = (await self.session.scalars(stmt)).all()
+            if deleted:
+                await self._count_dishes(submenu_id, -len(deleted))
+                await add_invalidation(self.session, 'dish', 'delete', menu_id=menu_id, submenu_id=submenu_id)
+                await self.session.commit()
+            return len(deleted)
+        except DBAPIError as e:
+            raise HTTPException(status_code=404, detail=f'{e.orig}')
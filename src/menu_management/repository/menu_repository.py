@@ -1,53 +1,105 @@
+import uuid
+from typing import Annotated, AsyncGenerator
+
 from fastapi import Depends, HTTPException
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import (
+    ARRAY,
+    RowMapping,
+    Select,
+    String,
+    Uuid,
+    any_,
+    bindparam,
+    delete,
+    insert,
+    or_,
+    select,
+    update,
+)
 from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_session
+from src.cache.outbox import FLUSH, add_invalidation
+from src.database.db import async_session_maker, get_read_session, get_session
 from src.database.models import Dish, Menu, Submenu
+from src.menu_management.importer import ImportRows
 
 
 class MenuRepository:
 
-    def __init__(self, session: AsyncSession = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session),
+                 read_session: Annotated[AsyncSession | None, Depends(get_read_session)] = None):
         self.session = session
+        # Replica session of the read-only methods, repositories built outside a request read from the primary
+        self.read_session = read_session or session
+
+    @staticmethod
+    def _select_with_counts() -> Select:
+        """
+        Selects menus with the counters of their submenus and dishes
+        """
+        return select(Menu.id, Menu.title, Menu.description, Menu.submenus_count, Menu.dishes_count)
 
-    async def get_menu_list(self) -> list[Menu]:
-        stmt = select(Menu)
-        result = await self.session.execute(stmt)
-        return list(result.scalars().fetchall())
+    async def get_menu_list(self, limit: int, after: uuid.UUID | None = None) -> list[RowMapping]:
+        """
+        Returns up to limit + 1 menus ordered by id, starting after the menu with id after
+        """
+        stmt = self._select_with_counts()
+        if after is not None:
+            stmt = stmt.where(Menu.id > after)
+        stmt = stmt.order_by(Menu.id).limit(limit + 1)
+        result = await self.read_session.execute(stmt)
+        return list(result.mappings().fetchall())
 
-    async def get_menu(self, menu_id: str) -> Menu:
-        stmt = select(Menu).where(Menu.id == menu_id).limit(1)
+    async def get_menu(self, menu_id: str) -> RowMapping | None:
+        stmt = self._select_with_counts().where(Menu.id == menu_id)
         try:
-            result = await self.session.execute(stmt)
-            result = result.scalar()
-            return result
+            result = await self.read_session.execute(stmt)
+            return result.mappings().first()
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
 
-    async def get_whole_base(self):
-        menu_list: list[Menu] = await self.get_menu_list()
-        result: list = []
-        for menu in menu_list:
-            submenu_list = await self.session.execute(select(Submenu).filter_by(menu_group=menu.id))
-            submenu_list = [submenu.__dict__ for submenu in submenu_list.scalars().fetchall()]
-            for submenu in submenu_list:
-                dishes = await self.session.execute(select(Dish).where(Dish.submenu_group == submenu.get('id')))
-                dishes = [dish.__dict__ for dish in dishes.scalars().fetchall()]
-                del submenu['menu_group']
-                submenu['dishes'] = dishes
-            menu = menu.__dict__
-            menu['submenus'] = submenu_list
-            result.append(menu)
-        return result
+    async def get_whole_base(self) -> tuple[list[RowMapping], list[RowMapping], list[RowMapping]]:
+        """
+        Loads the whole base with one query per table. The hierarchy is assembled by the caller.
+        The three queries share one REPEATABLE READ snapshot, so every submenu and dish finds its parent
+        """
+        await self.read_session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+        menus = await self.read_session.execute(select(Menu.id, Menu.title, Menu.description))
+        submenus = await self.read_session.execute(
+            select(Submenu.id, Submenu.title, Submenu.description, Submenu.menu_group))
+        dishes = await self.read_session.execute(
+            select(Dish.id, Dish.title, Dish.description, Dish.price, Dish.submenu_group))
+        return (list(menus.mappings().fetchall()), list(submenus.mappings().fetchall()),
+                list(dishes.mappings().fetchall()))
+
+    @staticmethod
+    async def stream_whole_base(rows_per_fetch: int = 1000) -> AsyncGenerator[RowMapping, None]:
+        """
+        Streams the whole base through a server-side cursor, one row per dish ordered by menu and submenu.
+        Opens its own session because the request session is closed before a streaming response is sent
+        """
+        stmt = (select(Menu.id.label('menu_id'), Menu.title.label('menu_title'),
+                       Menu.description.label('menu_description'),
+                       Submenu.id.label('submenu_id'), Submenu.title.label('submenu_title'),
+                       Submenu.description.label('submenu_description'),
+                       Dish.id.label('dish_id'), Dish.title.label('dish_title'),
+                       Dish.description.label('dish_description'), Dish.price.label('dish_price'))
+                .outerjoin(Submenu, Submenu.menu_group == Menu.id)
+                .outerjoin(Dish, Dish.submenu_group == Submenu.id)
+                .order_by(Menu.id, Submenu.id)
+                .execution_options(yield_per=rows_per_fetch))
+        async with async_session_maker() as session:
+            result = await session.stream(stmt)
+            async for row in result.mappings():
+                yield row
 
     async def add_new_menu(self, values: dict) -> Menu:
         stmt = insert(Menu).values(**values).returning(Menu)
         try:
-            new_menu = await self.session.execute(stmt)
+            new_menu = (await self.session.execute(stmt)).scalar()
+            await add_invalidation(self.session, 'menu', 'create', menu_id=new_menu.id)
             await self.session.commit()
-            new_menu = new_menu.scalar()
             return new_menu
         except IntegrityError:
             raise HTTPException(status_code=409, detail='This menu title already exists')
@@ -55,9 +107,10 @@ class MenuRepository:
     async def patch_menu(self, menu_id: str, menu: dict) -> Menu:
         stmt = update(Menu).where(Menu.id == menu_id).values(menu).returning(Menu)
         try:
-            new_menu = await self.session.execute(stmt)
+            new_menu = (await self.session.execute(stmt)).scalar()
+            if new_menu:
+                await add_invalidation(self.session, 'menu', 'update', menu_id=menu_id)
             await self.session.commit()
-            new_menu = new_menu.scalar()
             return new_menu
         except IntegrityError:
             raise HTTPException(status_code=409, detail='This menu name already exists')
@@ -68,14 +121,46 @@ class MenuRepository:
         stmt = delete(Menu).where(Menu.id == menu_id).returning(Menu)
         try:
             deleted_menu = await self.session.execute(stmt)
-            await self.session.commit()
             if deleted_menu.fetchone():
+                await add_invalidation(self.session, 'menu', 'delete', menu_id=menu_id)
+                await self.session.commit()
                 return {'status': True, 'message': 'menu has been deleted'}
             return {'status': False, 'message': 'menu not found'}
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
 
+    async def find_existing(self, rows: ImportRows) -> dict[str, list[tuple[str, uuid.UUID | str]]]:
+        """
+        Finds the rows of the base with the ids or the titles of the imported rows, one query per table
+
+        :return: per entity, the column and the value of every match
+        """
+        existing = {}
+        for entity, model, table in (('menu', Menu, rows.menus), ('submenu', Submenu, rows.submenus),
+                                     ('dish', Dish, rows.dishes)):
+            ids = bindparam(f'{entity}_ids', [row['id'] for row in table], type_=ARRAY(Uuid))
+            titles = bindparam(f'{entity}_titles', [row['title'] for row in table], type_=ARRAY(String))
+            result = await self.session.execute(select(model.id, model.title)
+                                                .where(or_(model.id == any_(ids), model.title == any_(titles))))
+            existing[entity] = [pair for found in result for pair in (('id', found.id), ('title', found.title))]
+        return existing
+
+    async def import_base(self, rows: ImportRows) -> None:
+        """
+        Inserts the imported menu trees with one multi-row insert per table and one invalidation event
+        in a single transaction
+        """
+        try:
+            for model, table in ((Menu, rows.menus), (Submenu, rows.submenus), (Dish, rows.dishes)):
+                if table:
+                    await self.session.execute(insert(model), table)
+            await add_invalidation(self.session, 'menu', 'create')
+            await self.session.commit()
+        except IntegrityError as e:
+            raise HTTPException(status_code=409, detail=f'{e.orig}')
+
     async def delete_all(self):
         stmt = delete(Menu)
         await self.session.execute(stmt)
+        await add_invalidation(self.session, 'menu', FLUSH)
         await self.session.commit()
@@ -1,40 +1,85 @@
+import uuid
+from typing import Annotated
+
 from fastapi import Depends, HTTPException
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import (
+    ARRAY,
+    RowMapping,
+    Select,
+    Uuid,
+    any_,
+    bindparam,
+    delete,
+    insert,
+    select,
+    update,
+)
 from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_session
-from src.database.models import Submenu
+from src.cache.outbox import add_invalidation
+from src.database.db import get_read_session, get_session
+from src.database.models import Menu, Submenu
 
 
 class SubmenuRepository:
 
-    def __init__(self, session: AsyncSession = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session),
+                 read_session: Annotated[AsyncSession | None, Depends(get_read_session)] = None):
         self.session = session
+        # Replica session of the read-only methods, repositories built outside a request read from the primary
+        self.read_session = read_session or session
+
+    @staticmethod
+    def _select_with_counts() -> Select:
+        """
+        Selects submenus with the counter of their dishes
+        """
+        return select(Submenu.id, Submenu.title, Submenu.description, Submenu.dishes_count)
 
-    async def get_list_submenus(self, menu_id: str) -> list[Submenu]:
-        stmt = select(Submenu).filter_by(menu_group=menu_id)
+    async def get_list_submenus(self, menu_id: str, limit: int, after: uuid.UUID | None = None) -> list[RowMapping]:
+        """
+        Returns up to limit + 1 submenus of the menu ordered by id, starting after the submenu with id after
+        """
+        stmt = self._select_with_counts().where(Submenu.menu_group == menu_id)
+        if after is not None:
+            stmt = stmt.where(Submenu.id > after)
+        stmt = stmt.order_by(Submenu.id).limit(limit + 1)
         try:
-            result = await self.session.execute(stmt)
-            return list(result.scalars().fetchall())
+            result = await self.read_session.execute(stmt)
+            return list(result.mappings().fetchall())
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
 
-    async def get_submenu(self, submenu_id: str) -> Submenu:
-        query = select(Submenu).where(Submenu.id == submenu_id)
+    async def get_submenu(self, menu_id: str, submenu_id: str) -> RowMapping | None:
+        query = self._select_with_counts().where(Submenu.id == submenu_id, Submenu.menu_group == menu_id)
         try:
-            result = await self.session.execute(query)
-            result = result.scalar()
-            return result
+            result = await self.read_session.execute(query)
+            return result.mappings().first()
+        except DBAPIError as e:
+            raise HTTPException(status_code=404, detail=f'{e.orig}')
+
+    async def get_submenus(self, menu_id: str, submenu_ids: list[uuid.UUID]) -> list[RowMapping]:
+        """
+        Returns the submenus of the menu with the given ids in one query, the ids not found are skipped
+        """
+        query = self._select_with_counts().where(
+            Submenu.menu_group == menu_id, Submenu.id == any_(bindparam('submenu_ids', submenu_ids, type_=ARRAY(Uuid))))
+        try:
+            result = await self.read_session.execute(query)
+            return list(result.mappings().fetchall())
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
 
     async def add_submenu(self, values: dict) -> Submenu:
         stmt = insert(Submenu).values(**values).returning(Submenu)
         try:
-            new_submenu = await self.session.execute(stmt)
+            new_submenu = (await self.session.execute(stmt)).scalar()
+            await self.session.execute(update(Menu).where(Menu.id == new_submenu.menu_group)
+                                       .values(submenus_count=Menu.submenus_count + 1))
+            await add_invalidation(self.session, 'submenu', 'create',
+                                   menu_id=new_submenu.menu_group, submenu_id=new_submenu.id)
             await self.session.commit()
-            new_submenu = new_submenu.scalar()
             return new_submenu
         except IntegrityError:
             raise HTTPException(status_code=409, detail='This submenu already exists or wrong menu_id')
@@ -44,9 +89,11 @@ class SubmenuRepository:
     async def update_submenu(self, submenu_id: str, submenu: dict) -> Submenu:
         stmt = update(Submenu).where(Submenu.id == submenu_id).values(submenu).returning(Submenu)
         try:
-            new_submenu = await self.session.execute(stmt)
+            new_submenu = (await self.session.execute(stmt)).scalar()
+            if new_submenu:
+                await add_invalidation(self.session, 'submenu', 'update',
+                                       menu_id=new_submenu.menu_group, submenu_id=submenu_id)
             await self.session.commit()
-            new_submenu = new_submenu.scalar()
             return new_submenu
         except DBAPIError as e:
             raise HTTPException(status_code=404, detail=f'{e.orig}')
@@ -54,9 +101,15 @@ class SubmenuRepository:
     async def delete_submenu(self, take_id: str) -> dict[str, str | bool]:
         stmt = delete(Submenu).where(Submenu.id == take_id).returning(Submenu)
         try:
-            deleted_submenu = await self.session.execute(stmt)
-            await self.session.commit()
-            if deleted_submenu.scalar():
+            deleted_submenu = (await self.session.execute(stmt)).scalar()
+            if deleted_submenu:
+                # The dishes of the submenu are deleted by the cascade
+                await self.session.execute(update(Menu).where(Menu.id == deleted_submenu.menu_group)
+                                           .values(submenus_count=Menu.submenus_count - 1,
+                                                   dishes_count=Menu.dishes_count - deleted_submenu.dishes_count))
+                await add_invalidation(self.session, 'submenu', 'delete',
+                                       menu_id=deleted_submenu.menu_group, submenu_id=take_id)
+                await self.session.commit()
                 return {'status': True, 'message': 'submenu has been deleted'}
             return {'status': False, 'message': 'submenu not found'}
         except DBAPIError as e:
@@ -0,0 +1,40 @@
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from src.cache.entry import CacheEntry
+
+
+class RawJSONResponse(JSONResponse):
+    """
+    Sends already serialized JSON bytes as they are. The route response_model is used only for the docs
+    """
+
+    def render(self, content: bytes) -> bytes:
+        return content
+
+
+def conditional_response(entry: CacheEntry, if_none_match: str | None, cache_control: str) -> Response:
+    """
+    Answers 304 without a body when the client already has the cached version, otherwise sends the body.
+    Both carry the ETag of the entry and the Cache-Control of the route, pages of lists also carry
+    the cursor of the next page in X-Next-Cursor
+
+    :param entry: cached response body
+    :param if_none_match: If-None-Match header of the request
+    :param cache_control: Cache-Control header of the route
+    :return: Response
+    """
+    headers = {'ETag': entry.etag, 'Cache-Control': cache_control}
+    if entry.next_cursor:
+        headers['X-Next-Cursor'] = entry.next_cursor
+    if if_none_match is not None and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return RawJSONResponse(entry.body, headers=headers)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Weak comparison of If-None-Match: a list of entity tags or '*'
+    """
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in (tag.removeprefix('W/') for tag in tags)
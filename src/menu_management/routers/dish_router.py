@@ -1,8 +1,16 @@
+import uuid
 from typing import Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Header, Query
 
-from src.menu_management.schemas.schemas import CreateDish, DishResponse, PatchDish
+from src.config import settings
+from src.menu_management.responses import RawJSONResponse, conditional_response
+from src.menu_management.schemas.schemas import (
+    BulkPatchDish,
+    CreateDish,
+    DishResponse,
+    PatchDish,
+)
 from src.menu_management.sevices.dish_service import DishService
 
 dish_router = APIRouter(
@@ -12,37 +20,80 @@ dish_router = APIRouter(
 
 
 @dish_router.get('/', response_model=list[DishResponse], status_code=200,
+                 response_class=RawJSONResponse,
                  description='Возвращает список блюд для подменю, если  submenu_id не существует или блюд нет'
-                             ' - возвращает пустой список', summary='получить список блюд')
-async def get_all_dishes(submenu_id: str, dish_service: DishService = Depends()):
-    return await dish_service.get_all_dishes(submenu_id)
+                             ' - возвращает пустой список. Список отдается страницами по limit блюд, '
+                             'курсор следующей страницы возвращается в заголовке X-Next-Cursor',
+                 summary='получить список блюд')
+async def get_all_dishes(menu_id: str, submenu_id: str,
+                         limit: int = Query(default=settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                         cursor: str | None = None, if_none_match: str | None = Header(default=None),
+                         dish_service: DishService = Depends()):
+    return conditional_response(await dish_service.get_all_dishes(menu_id, submenu_id, limit, cursor), if_none_match,
+                                settings.CACHE_CONTROL_DISH_LIST)
+
+
+@dish_router.get('/batch', response_model=list[DishResponse], status_code=200,
+                 response_class=RawJSONResponse,
+                 description='Возвращает блюда подменю по списку dish_id в параметрах ids в порядке запроса. '
+                             'Ненайденные блюда пропускаются. Блюда из кэша читаются одним запросом, '
+                             'остальные загружаются из базы одним запросом',
+                 summary='получить несколько блюд')
+async def get_dishes_batch(menu_id: str, submenu_id: str,
+                           ids: list[uuid.UUID] = Query(min_length=1, max_length=settings.PAGE_SIZE_MAX),
+                           dish_service: DishService = Depends()):
+    return RawJSONResponse(await dish_service.get_dishes(menu_id, submenu_id, ids))
 
 
 @dish_router.get('/{dish_id}', response_model=DishResponse, status_code=200,
+                 response_class=RawJSONResponse,
                  description='Возвращает экземпляр определенного блюда по переданному dish_id. '
                              'Если dish_id не найден - вызывается исключение с ошибкой 404',
                  summary='получить определенное блюдо')
-async def get_specific_dish(dish_id: str, dish_service: DishService = Depends()):
-    return await dish_service.get_dish(dish_id)
+async def get_specific_dish(menu_id: str, submenu_id: str, dish_id: str,
+                            if_none_match: str | None = Header(default=None), dish_service: DishService = Depends()):
+    return conditional_response(await dish_service.get_dish(menu_id, submenu_id, dish_id), if_none_match,
+                                settings.CACHE_CONTROL_DISH)
 
 
 @dish_router.post('/', response_model=DishResponse, status_code=201,
                   description='Создает новое блюдо. Принимает схему с названием, описанием и ценой. '
                               'Возвращает объект нового блюда', summary='создать новое блюдо')
-async def add_dish(submenu_id: str, menu_id: str, new_submenu: CreateDish, dish_service: DishService = Depends()):
-    return await dish_service.post_dish(submenu_id, menu_id, new_submenu)
+async def add_dish(menu_id: str, submenu_id: str, new_submenu: CreateDish, dish_service: DishService = Depends()):
+    return await dish_service.post_dish(menu_id, submenu_id, new_submenu)
+
+
+@dish_router.patch('/', response_model=list[DishResponse], status_code=200,
+                   description='Изменяет несколько блюд подменю одной транзакцией. Принимает список с dish_id и '
+                               'новыми значениями полей, незаданные поля не меняются. Возвращает обновленные блюда. '
+                               'Если хоть одно блюдо не найдено - ничего не меняется и вызывается исключение '
+                               'с ошибкой 404', summary='изменить несколько блюд')
+async def patch_dishes(menu_id: str, submenu_id: str,
+                       dishes: list[BulkPatchDish] = Body(min_length=1, max_length=settings.PAGE_SIZE_MAX),
+                       dish_service: DishService = Depends()):
+    return await dish_service.patch_dishes(menu_id, submenu_id, dishes)
 
 
 @dish_router.patch('/{dish_id}', response_model=DishResponse, status_code=200,
                    description='Изменяет существующее блюдо. Принимает dish_id для поиска и схему с новыми данными.'
                                'Возвращает обновленный экземпляр. Если dish_id не найден - '
                                'вызывается исключение с ошибкой 404', summary='Изменить существующее блюдо')
-async def patch_menu(dish_id: str, new_submenu: PatchDish, dish_service: DishService = Depends()):
-    return await dish_service.patch_dish(dish_id, new_submenu)
+async def patch_menu(menu_id: str, submenu_id: str, dish_id: str, new_submenu: PatchDish,
+                     dish_service: DishService = Depends()):
+    return await dish_service.patch_dish(menu_id, submenu_id, dish_id, new_submenu)
+
+
+@dish_router.delete('/', response_model=dict[str, Union[str, bool]], status_code=200,
+                    description='Удаляет несколько блюд подменю по списку dish_id в параметрах ids одним запросом. '
+                                'Возвращает словарь с количеством удаленных блюд', summary='удалить несколько блюд')
+async def delete_dishes(menu_id: str, submenu_id: str,
+                        ids: list[uuid.UUID] = Query(min_length=1, max_length=settings.PAGE_SIZE_MAX),
+                        dish_service: DishService = Depends()):
+    return await dish_service.delete_dishes(menu_id, submenu_id, ids)
 
 
 @dish_router.delete('/{dish_id}', response_model=dict[str, Union[str, bool]], status_code=200,
                     description='Удаляет существующее блюдо. Принимает dish_id для поиска.'
                                 'Возвращает словарь с информацией, что удаление совершено.', summary='удалить меню')
-async def delete_menu(dish_id: str, submenu_id: str, dish_service: DishService = Depends()):
-    return await dish_service.delete(dish_id, submenu_id)
+async def delete_menu(menu_id: str, submenu_id: str, dish_id: str, dish_service: DishService = Depends()):
+    return await dish_service.delete(menu_id, submenu_id, dish_id)
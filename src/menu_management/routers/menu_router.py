@@ -1,8 +1,17 @@
 from typing import Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
 
-from src.menu_management.schemas.schemas import CreateMenu, MenuResponse, PatchMenu
+from src.config import settings
+from src.menu_management.responses import RawJSONResponse, conditional_response
+from src.menu_management.schemas.schemas import (
+    CreateMenu,
+    ImportResult,
+    MenuResponse,
+    MenuTree,
+    PatchMenu,
+)
 from src.menu_management.sevices.menu_service import MenuService
 
 menu_router = APIRouter(
@@ -12,24 +21,60 @@ menu_router = APIRouter(
 
 
 @menu_router.get('/', response_model=list[MenuResponse], status_code=200,
+                 response_class=RawJSONResponse,
                  description='Возвращает список меню которые есть в базе, '
-                             'если база пуста - возвращает пустой список', summary='получить список меню')
-async def get_all_menus(menu_service: MenuService = Depends()):
-    result = await menu_service.get_all_menu()
-    return result
+                             'если база пуста - возвращает пустой список. Список отдается страницами по limit меню, '
+                             'курсор следующей страницы возвращается в заголовке X-Next-Cursor',
+                 summary='получить список меню')
+async def get_all_menus(limit: int = Query(default=settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                        cursor: str | None = None, if_none_match: str | None = Header(default=None),
+                        menu_service: MenuService = Depends()):
+    return conditional_response(await menu_service.get_all_menu(limit, cursor), if_none_match,
+                                settings.CACHE_CONTROL_MENU_LIST)
+
+
+@menu_router.get('/getbase', response_model=list[MenuTree], status_code=200,
+                 response_class=RawJSONResponse,
+                 description='Возвращает всю базу в виде дерева: меню с вложенными подменю и блюдами. '
+                             'Данные загружаются тремя запросами, по одному на таблицу',
+                 summary='получить всю базу')
+async def get_base(if_none_match: str | None = Header(default=None), menu_service: MenuService = Depends()):
+    return conditional_response(await menu_service.get_whole_base(), if_none_match, settings.CACHE_CONTROL_BASE)
+
+
+@menu_router.get('/export', response_class=StreamingResponse, status_code=200,
+                 description='Выгружает всю базу потоком в формате NDJSON: по строке на каждое меню, подменю и блюдо, '
+                             'дочерние записи идут сразу после родительской. Память не зависит от размера базы. '
+                             'С параметром gzip=true поток сжимается',
+                 summary='выгрузить всю базу')
+async def export_base(gzip: bool = False, menu_service: MenuService = Depends()):
+    headers = {'Content-Encoding': 'gzip'} if gzip else None
+    return StreamingResponse(menu_service.export_base(compress=gzip), media_type='application/x-ndjson',
+                             headers=headers)
 
 
-@menu_router.get('/getbase', status_code=200)
-async def get_base(menu_service: MenuService = Depends()):
-    result = await menu_service.get_whole_base()
-    return result
+@menu_router.post('/import', response_model=ImportResult, status_code=201,
+                  description='Загружает целые меню с подменю и блюдами одной транзакцией. Принимает JSON-список '
+                              'меню с вложенными подменю и блюдами или поток NDJSON в формате выгрузки '
+                              '(application/x-ndjson). Если хоть одна запись неверна или ее id или название уже '
+                              'заняты, ничего не записывается, а ошибки возвращаются по каждой записи. '
+                              'Возвращает количество загруженных меню, подменю и блюд',
+                  summary='загрузить меню целиком',
+                  openapi_extra={'requestBody': {'content': {
+                      'application/json': {'schema': {'type': 'array', 'items': {'type': 'object'}}},
+                      'application/x-ndjson': {'schema': {'type': 'string'}}}}})
+async def import_base(request: Request, menu_service: MenuService = Depends()):
+    content_type = request.headers.get('content-type', 'application/json').split(';')[0].strip()
+    return await menu_service.import_base(content_type, request.stream())
 
 
 @menu_router.get('/{menu_id}', response_model=MenuResponse, status_code=200,
+                 response_class=RawJSONResponse,
                  description='Возвращает экземпляр определенного меню по переданному menu_id. Если menu_id не найден - '
                              'вызывается исключение с ошибкой 404', summary='получить определенное меню')
-async def get_specific_menu(menu_id: str, menu_service: MenuService = Depends()):
-    return await menu_service.get_menu(menu_id)
+async def get_specific_menu(menu_id: str, if_none_match: str | None = Header(default=None),
+                            menu_service: MenuService = Depends()):
+    return conditional_response(await menu_service.get_menu(menu_id), if_none_match, settings.CACHE_CONTROL_MENU)
 
 
 @menu_router.post('/', response_model=MenuResponse, status_code=201,
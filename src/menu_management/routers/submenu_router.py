@@ -1,7 +1,10 @@
+import uuid
 from typing import Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query
 
+from src.config import settings
+from src.menu_management.responses import RawJSONResponse, conditional_response
 from src.menu_management.schemas.schemas import (
     CreateSubmenu,
     PatchSubmenu,
@@ -16,19 +19,41 @@ submenu_router = APIRouter(
 
 
 @submenu_router.get('/', response_model=list[SubmenuResponse], status_code=200,
+                    response_class=RawJSONResponse,
                     description='Возвращает список подменю для определенного меню которое есть в базе, '
-                                'если подменю нет - возвращает пустой список', summary='получить список подменю')
-async def get_submenus(menu_id: str, submenu_service: SubmenuService = Depends()):
-    return await submenu_service.get_all_submenus(menu_id)
+                                'если подменю нет - возвращает пустой список. Список отдается страницами по limit '
+                                'подменю, курсор следующей страницы возвращается в заголовке X-Next-Cursor',
+                    summary='получить список подменю')
+async def get_submenus(menu_id: str,
+                       limit: int = Query(default=settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                       cursor: str | None = None, if_none_match: str | None = Header(default=None),
+                       submenu_service: SubmenuService = Depends()):
+    return conditional_response(await submenu_service.get_all_submenus(menu_id, limit, cursor), if_none_match,
+                                settings.CACHE_CONTROL_SUBMENU_LIST)
+
+
+@submenu_router.get('/batch', response_model=list[SubmenuResponse], status_code=200,
+                    response_class=RawJSONResponse,
+                    description='Возвращает подменю меню по списку submenu_id в параметрах ids в порядке запроса. '
+                                'Ненайденные подменю пропускаются. Подменю из кэша читаются одним запросом, '
+                                'остальные загружаются из базы одним запросом',
+                    summary='получить несколько подменю')
+async def get_submenus_batch(menu_id: str,
+                             ids: list[uuid.UUID] = Query(min_length=1, max_length=settings.PAGE_SIZE_MAX),
+                             submenu_service: SubmenuService = Depends()):
+    return RawJSONResponse(await submenu_service.get_submenus(menu_id, ids))
 
 
 @submenu_router.get('/{submenu_id}', response_model=SubmenuResponse, status_code=200,
+                    response_class=RawJSONResponse,
                     description='Возвращает экземпляр определенного подменю по переданному submenu_id. '
                                 'Если submenu_id не найден - вызывается исключение с ошибкой 404',
                     summary='получить определенное подменю'
                     )
-async def get_specific_submenu(submenu_id: str, submenu_service: SubmenuService = Depends()):
-    return await submenu_service.get_submenu(submenu_id)
+async def get_specific_submenu(menu_id: str, submenu_id: str, if_none_match: str | None = Header(default=None),
+                               submenu_service: SubmenuService = Depends()):
+    return conditional_response(await submenu_service.get_submenu(menu_id, submenu_id), if_none_match,
+                                settings.CACHE_CONTROL_SUBMENU)
 
 
 @submenu_router.post('/', response_model=SubmenuResponse, status_code=201,
@@ -42,12 +67,13 @@ async def add_submenu(menu_id: str, new_submenu: CreateSubmenu, submenu_service:
                       description='Изменяет существующее подменю. Принимает submenu_id для поиска и схему с новыми '
                                   'данными. Возвращает обновленный экземпляр. Если submenu_id не найден - '
                                   'вызывается исключение с ошибкой 404', summary='Изменить существующее подменю')
-async def patch_menu(submenu_id: str, new_submenu: PatchSubmenu, submenu_service: SubmenuService = Depends()):
-    return await submenu_service.patch_submenu(submenu_id, new_submenu)
+async def patch_menu(menu_id: str, submenu_id: str, new_submenu: PatchSubmenu,
+                     submenu_service: SubmenuService = Depends()):
+    return await submenu_service.patch_submenu(menu_id, submenu_id, new_submenu)
 
 
 @submenu_router.delete('/{submenu_id}', response_model=dict[str, Union[str, bool]], status_code=200,
                        description='Удаляет существующее подменю. Принимает submenu_id для поиска.Возвращает '
                                    'словарь с информацией, что удаление совершено.', summary='удалить подменю')
-async def delete_menu(submenu_id: str, menu_id: str, submenu_service: SubmenuService = Depends()):
-    return await submenu_service.delete(submenu_id, menu_id)
+async def delete_menu(menu_id: str, submenu_id: str, submenu_service: SubmenuService = Depends()):
+    return await submenu_service.delete(menu_id, submenu_id)
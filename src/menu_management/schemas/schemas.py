@@ -1,6 +1,34 @@
 import uuid
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Annotated
 
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, BeforeValidator, Field, PlainSerializer
+
+# Bound of the NUMERIC(10, 2) price column
+MAX_PRICE = Decimal('99999999.99')
+
+
+def _price_from_string(value):
+    # Prices come as strings, a JSON number would be rounded by the client parser
+    if not isinstance(value, str | Decimal):
+        raise ValueError('price must be a string')
+    return value
+
+
+def _round_price(value: Decimal) -> Decimal:
+    try:
+        value = value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        # too many digits to round to cents, so far above the bound
+        raise ValueError(f'price must not exceed {MAX_PRICE}')
+    if abs(value) > MAX_PRICE:
+        raise ValueError(f'price must not exceed {MAX_PRICE}')
+    return value
+
+
+# Decimal price rounded to cents as the database stores it, serialized to JSON as a string with two decimal places
+Price = Annotated[Decimal, BeforeValidator(_price_from_string), AfterValidator(_round_price),
+                  PlainSerializer(lambda value: f'{value:.2f}', return_type=str, when_used='json')]
 
 
 class BaseResponse(BaseModel):
@@ -44,17 +72,52 @@ class PatchSubmenu(CreateSubmenu):
 class DishResponse(BaseResponse):
     title: str
     description: str
-    price: str
+    price: Price
 
 
 class CreateDish(BaseModel):
     title: str
     description: str
-    price: str
+    price: Price
 
     def to_dict(self):
         return self.model_dump(exclude={'id'})
 
 
 class PatchDish(CreateSubmenu):
-    price: str
+    price: Price
+
+
+class BulkPatchDish(BaseModel):
+    id: uuid.UUID
+    title: str | None = None
+    description: str | None = None
+    price: Price | None = None
+
+
+class SubmenuTree(BaseResponse):
+    dishes: list[DishResponse] = Field(default_factory=list)
+
+
+class MenuTree(BaseResponse):
+    submenus: list[SubmenuTree] = Field(default_factory=list)
+
+
+class ImportDish(CreateDish):
+    id: uuid.UUID | None = None
+
+
+class ImportSubmenu(CreateSubmenu):
+    id: uuid.UUID | None = None
+    dishes: list[ImportDish] = Field(default_factory=list)
+
+
+class ImportMenu(CreateMenu):
+    id: uuid.UUID | None = None
+    submenus: list[ImportSubmenu] = Field(default_factory=list)
+
+
+class ImportResult(BaseModel):
+    menus: int
+    submenus: int
+    dishes: int
@@ -1,9 +1,18 @@
+import uuid
+
 from fastapi import BackgroundTasks, Depends, HTTPException
 
-from src.cache.client import RedisClient
-from src.database.models import Dish
+from src.cache.client import CacheKey, RedisClient, dumps
+from src.cache.entry import CacheEntry, Page
+from src.cache.outbox import dispatch_after_write, written_events
+from src.menu_management.pagination import decode_cursor, split_page
 from src.menu_management.repository.dish_repository import DishRepository
-from src.menu_management.schemas.schemas import CreateDish, PatchDish
+from src.menu_management.schemas.schemas import (
+    BulkPatchDish,
+    CreateDish,
+    DishResponse,
+    PatchDish,
+)
 from src.menu_management.sevices.submenu_service import SubmenuService
 
 
@@ -16,54 +25,106 @@ class DishService:
         self.redis_cache = redis_cache
         self.background_task = background_tasks
 
-    async def get_all_dishes(self, submenu_id: str) -> list[Dish]:
-        cache = self.redis_cache.get_cache('all_dish', submenu_id)
-        if cache:
-            return cache
-        dishes = await self.dish_repository.get_dish_list(submenu_id)
-        self.background_task.add_task(self.redis_cache.set_cache, 'all_dish', submenu_id, dishes)
-        return dishes
-
-    async def get_dish(self, dish_id: str) -> Dish:
-        cache = self.redis_cache.get_cache('dish', dish_id)
-        if cache:
-            return cache
-        dish = await self.dish_repository.get_dish(dish_id)
+    async def get_all_dishes(self, menu_id: str, submenu_id: str, limit: int, cursor: str | None = None) -> CacheEntry:
+        after = decode_cursor(cursor)
+        return await self.redis_cache.get_or_load(
+            CacheKey.dish_list(menu_id, submenu_id, limit, cursor), 'dish', self.dish_repository,
+            lambda repository: self.__load_dish_list(repository, submenu_id, limit, after))
+
+    @staticmethod
+    async def __load_dish_list(dish_repository: DishRepository, submenu_id: str, limit: int,
+                               after: uuid.UUID | None) -> Page:
+        dishes, next_cursor = split_page(await dish_repository.get_dish_list(submenu_id, limit, after), limit)
+        return Page(dumps([DishResponse(**dish) for dish in dishes]), next_cursor)
+
+    async def get_dish(self, menu_id: str, submenu_id: str, dish_id: str) -> CacheEntry:
+        return await self.redis_cache.get_or_load(
+            CacheKey.dish(menu_id, submenu_id, dish_id), 'dish', self.dish_repository,
+            lambda repository: self.__load_dish(repository, submenu_id, dish_id))
+
+    @staticmethod
+    async def __load_dish(dish_repository: DishRepository, submenu_id: str, dish_id: str) -> bytes:
+        dish = await dish_repository.get_dish(submenu_id, dish_id)
         if dish:
-            self.background_task.add_task(self.redis_cache.set_cache, 'dish', dish_id, dish)
-            return dish
+            return dumps(DishResponse(**dish))
         raise HTTPException(status_code=404, detail='dish not found')
 
-    async def post_dish(self, submenu_id: str, menu_id: str, dish: CreateDish) -> Dish:
+    async def get_dishes(self, menu_id: str, submenu_id: str, dish_ids: list[uuid.UUID]) -> bytes:
+        """
+        Returns a JSON list of the dishes with the given ids in their order, the ids not found are skipped.
+        The dishes share the cache of the single dish route, the missing ones are loaded with one query
+
+        :return: JSON bytes
+        """
+        dish_ids = list(dict.fromkeys(dish_ids))
+
+        async def load_missing(dish_repository: DishRepository, positions: list[int]) -> dict[int, bytes]:
+            dishes = {dish['id']: dish for dish in
+                      await dish_repository.get_dishes(submenu_id, [dish_ids[position] for position in positions])}
+            return {position: dumps(DishResponse(**dishes[dish_ids[position]]))
+                    for position in positions if dish_ids[position] in dishes}
+
+        entries = await self.redis_cache.get_or_load_many(
+            [CacheKey.dish(menu_id, submenu_id, dish_id) for dish_id in dish_ids], 'dish', self.dish_repository,
+            load_missing)
+        return b'[' + b','.join(entry.body for entry in entries if entry is not None) + b']'
+
+    async def post_dish(self, menu_id: str, submenu_id: str, dish: CreateDish) -> DishResponse:
         new_dish = dish.to_dict()
-        await self.submenu_service.get_submenu(submenu_id)
+        await self.submenu_service.get_submenu(menu_id, submenu_id)
         new_dish['submenu_group'] = submenu_id
-        new_dish['price'] = str('{:.2f}'.format(float(str(new_dish.get('price')))))
-        self.background_task.add_task(self.redis_cache.clear_cache, 'all_dish', submenu_id)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'submenu', 'all_submenu')
-        self.background_task.add_task(self.redis_cache.clear_cache, 'submenu', submenu_id)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', 'all_menu')
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', menu_id)
-        self.background_task.add_task(self.redis_cache.set_cache, 'dish', submenu_id, new_dish)
-        return await self.dish_repository.add_dish(new_dish)
-
-    async def patch_dish(self, submenu_id: str, dish: PatchDish) -> Dish:
+        new_dish = await self.dish_repository.add_dish(menu_id, new_dish)
+        new_dish = DishResponse(id=new_dish.id, title=new_dish.title, description=new_dish.description,
+                                price=new_dish.price)
+        self.background_task.add_task(dispatch_after_write,
+                                      values=[(CacheKey.dish(menu_id, submenu_id, new_dish.id), dumps(new_dish),
+                                               'dish')],
+                                      written=written_events(self.dish_repository.session))
+        return new_dish
+
+    async def patch_dish(self, menu_id: str, submenu_id: str, dish_id: str, dish: PatchDish) -> DishResponse:
         dish = dish.to_dict()
-        try:
-            dish['price'] = str('{:.2f}'.format(float(str(dish.get('price')))))
-        except ValueError:
-            raise HTTPException(status_code=400, detail='price is not digits')
-        patched_dish = await self.dish_repository.update_dish(submenu_id, dish)
-        if patched_dish:
-            self.background_task.add_task(self.redis_cache.clear_cache, 'all_dish', submenu_id)
-            self.background_task.add_task(self.redis_cache.set_cache, 'dish', patched_dish.id, patched_dish)
+        patched = await self.dish_repository.update_dish(submenu_id, dish_id, dish)
+        if patched:
+            patched_dish = DishResponse(id=patched.id, title=patched.title, description=patched.description,
+                                        price=patched.price)
+            self.background_task.add_task(dispatch_after_write,
+                                          values=[(CacheKey.dish(patched.menu_id, submenu_id, dish_id),
+                                                   dumps(patched_dish), 'dish')],
+                                          written=written_events(self.dish_repository.session))
             return patched_dish
         raise HTTPException(status_code=404, detail='dish not found')
 
-    async def delete(self, dish_id: str, submenu_id: str) -> dict[str, bool | str]:
-        result = await self.dish_repository.delete_dish(dish_id)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'all_dish', submenu_id)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'submenu', 'all_submenu')
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', 'all_menu')
-        self.background_task.add_task(self.redis_cache.clear_cache, 'dish', dish_id)
+    async def delete(self, menu_id: str, submenu_id: str, dish_id: str) -> dict[str, bool | str]:
+        result = await self.dish_repository.delete_dish(submenu_id, dish_id)
+        if result['status']:
+            self.background_task.add_task(dispatch_after_write,
+                                          written=written_events(self.dish_repository.session))
         return result
+
+    async def patch_dishes(self, menu_id: str, submenu_id: str, dishes: list[BulkPatchDish]) -> list[DishResponse]:
+        """
+        Patches many dishes of the submenu in one transaction and caches them with one pipeline
+
+        :return: patched dishes in the order of the request
+        """
+        await self.submenu_service.get_submenu(menu_id, submenu_id)
+        positions = {dish.id: position for position, dish in enumerate(dishes)}
+        if len(positions) < len(dishes):
+            raise HTTPException(status_code=422, detail='dish ids are repeated')
+        patched = sorted((DishResponse(**dish) for dish in await self.dish_repository.update_dishes(
+            menu_id, submenu_id, [dish.model_dump() for dish in dishes])), key=lambda dish: positions[dish.id])
+        self.background_task.add_task(dispatch_after_write,
+                                      values=[(CacheKey.dish(menu_id, submenu_id, dish.id), dumps(dish), 'dish')
+                                              for dish in patched],
+                                      written=written_events(self.dish_repository.session))
+        return patched
+
+    async def delete_dishes(self, menu_id: str, submenu_id: str, dish_ids: list[uuid.UUID]) -> dict[str, bool | str]:
+        await self.submenu_service.get_submenu(menu_id, submenu_id)
+        deleted = await self.dish_repository.delete_dishes(menu_id, submenu_id, dish_ids)
+        if deleted:
+            self.background_task.add_task(dispatch_after_write,
+                                          written=written_events(self.dish_repository.session))
+            return {'status': True, 'message': f'{deleted} dishes have been deleted'}
+        return {'status': False, 'message': 'The dishes not found'}
@@ -1,10 +1,25 @@
+import json
+import uuid
+import zlib
+from typing import AsyncGenerator, AsyncIterable
+
 from fastapi import BackgroundTasks, Depends, HTTPException
 
-from src.cache.client import RedisClient, redis_client
-from src.database.models import Menu
+from src.cache.client import CacheKey, RedisClient, dumps
+from src.cache.entry import CacheEntry, Page
+from src.cache.outbox import dispatch_after_write, written_events
+from src.menu_management.importer import conflicts, rows_from_json, rows_from_ndjson
+from src.menu_management.pagination import decode_cursor, split_page
 from src.menu_management.repository.menu_repository import MenuRepository
-from src.menu_management.schemas.schemas import CreateMenu, MenuResponse, PatchMenu
-from src.menu_management.utils import dishes_counter, submenus_counter
+from src.menu_management.schemas.schemas import (
+    CreateMenu,
+    DishResponse,
+    ImportResult,
+    MenuResponse,
+    MenuTree,
+    PatchMenu,
+    SubmenuTree,
+)
 
 
 class MenuService:
@@ -15,60 +30,128 @@ class MenuService:
         self.redis_cache = redis_cache
         self.background_task = background_tasks
 
-    async def get_all_menu(self) -> list[MenuResponse] | None:
-        cache = self.redis_cache.get_cache('menu', 'all_menu')
-        if cache:
-            return cache
-        menus = await self.menu_repository.get_menu_list()
-        self.background_task.add_task(self.redis_cache.set_cache, 'menu', 'all_menu', menus)
-        return [await self.__turn_to_model(menu) for menu in menus]
+    async def get_all_menu(self, limit: int, cursor: str | None = None) -> CacheEntry:
+        after = decode_cursor(cursor)
+        return await self.redis_cache.get_or_load(CacheKey.menu_list(limit, cursor), 'menu', self.menu_repository,
+                                                  lambda repository: self.__load_menu_list(repository, limit, after))
 
-    async def get_whole_base(self):
-        result = await self.menu_repository.get_whole_base()
-        return result
+    @staticmethod
+    async def __load_menu_list(menu_repository: MenuRepository, limit: int, after: uuid.UUID | None) -> Page:
+        menus, next_cursor = split_page(await menu_repository.get_menu_list(limit, after), limit)
+        return Page(dumps([MenuResponse(**menu) for menu in menus]), next_cursor)
+
+    async def get_whole_base(self) -> CacheEntry:
+        return await self.redis_cache.get_or_load(CacheKey.base(), 'menu', self.menu_repository,
+                                                  self.__load_whole_base)
+
+    @staticmethod
+    async def __load_whole_base(menu_repository: MenuRepository) -> bytes:
+        menu_rows, submenu_rows, dish_rows = await menu_repository.get_whole_base()
+        menus = {menu.id: MenuTree(id=menu.id, title=menu.title, description=menu.description)
+                 for menu in menu_rows}
+        submenus: dict = {}
+        for submenu in submenu_rows:
+            submenus[submenu.id] = SubmenuTree(id=submenu.id, title=submenu.title, description=submenu.description)
+            menus[submenu.menu_group].submenus.append(submenus[submenu.id])
+        for dish in dish_rows:
+            submenus[dish.submenu_group].dishes.append(
+                DishResponse(id=dish.id, title=dish.title, description=dish.description, price=dish.price))
+        return dumps(list(menus.values()))
+
+    async def export_base(self, compress: bool = False,
+                          chunk_size: int = 64 * 1024) -> AsyncGenerator[bytes, None]:
+        """
+        Yields the whole base as newline-delimited JSON: one line per menu, submenu and dish,
+        each child right after its parent. Lines are buffered into chunks of about chunk_size bytes
+        """
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+        buffer = bytearray()
+        menu_id = submenu_id = None
+        async for row in self.menu_repository.stream_whole_base():
+            if row.menu_id != menu_id:
+                menu_id = row.menu_id
+                buffer += self.__ndjson_line(type='menu', id=str(row.menu_id), title=row.menu_title,
+                                             description=row.menu_description)
+            if row.submenu_id is not None and row.submenu_id != submenu_id:
+                submenu_id = row.submenu_id
+                buffer += self.__ndjson_line(type='submenu', id=str(row.submenu_id), menu_id=str(row.menu_id),
+                                             title=row.submenu_title, description=row.submenu_description)
+            if row.dish_id is not None:
+                buffer += self.__ndjson_line(type='dish', id=str(row.dish_id), submenu_id=str(row.submenu_id),
+                                             title=row.dish_title, description=row.dish_description,
+                                             price=f'{row.dish_price:.2f}')
+            if len(buffer) >= chunk_size:
+                yield compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+                buffer.clear()
+        if compressor:
+            yield compressor.compress(bytes(buffer)) + compressor.flush()
+        elif buffer:
+            yield bytes(buffer)
+
+    async def get_menu(self, menu_id: str) -> CacheEntry:
+        return await self.redis_cache.get_or_load(CacheKey.menu(menu_id), 'menu', self.menu_repository,
+                                                  lambda repository: self.__load_menu(repository, menu_id))
 
-    async def get_menu(self, menu_id: str) -> MenuResponse:
-        cache = self.redis_cache.get_cache('menu', menu_id)
-        if cache:
-            return cache
-        menu = await self.menu_repository.get_menu(menu_id)
+    async def __load_menu(self, menu_repository: MenuRepository, menu_id: str) -> bytes:
+        menu = await menu_repository.get_menu(menu_id)
         await self.__check_response(menu)
-        self.background_task.add_task(self.redis_cache.set_cache, 'menu', menu_id, menu)
-        return await self.__turn_to_model(menu)
+        return dumps(MenuResponse(**menu))
 
-    async def post_menu(self, new_menu: CreateMenu) -> Menu:
+    async def post_menu(self, new_menu: CreateMenu) -> MenuResponse:
         new_menu = new_menu.to_dict()
         added_menu = await self.menu_repository.add_new_menu(new_menu)
-        self.background_task.add_task(self.redis_cache.set_cache, 'menu', added_menu.id, added_menu)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', 'all_menu')
+        added_menu = MenuResponse(id=added_menu.id, title=added_menu.title, description=added_menu.description)
+        self.background_task.add_task(dispatch_after_write,
+                                      values=[(CacheKey.menu(added_menu.id), dumps(added_menu), 'menu')],
+                                      written=written_events(self.menu_repository.session))
         return added_menu
 
     async def patch_menu(self, menu_id: str, menu: PatchMenu) -> MenuResponse:
         menu = menu.to_dict()
         patched_menu = await self.menu_repository.patch_menu(menu_id, menu)
         await self.__check_response(patched_menu)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', 'all_menu')
-        self.background_task.add_task(self.redis_cache.set_cache, 'menu', menu_id, patched_menu)
-        return await self.__turn_to_model(patched_menu)
+        patched_menu = MenuResponse(id=patched_menu.id, title=patched_menu.title, description=patched_menu.description,
+                                    submenus_count=patched_menu.submenus_count, dishes_count=patched_menu.dishes_count)
+        self.background_task.add_task(dispatch_after_write,
+                                      values=[(CacheKey.menu(menu_id), dumps(patched_menu), 'menu')],
+                                      written=written_events(self.menu_repository.session))
+        return patched_menu
 
     async def delete(self, menu_id: str) -> dict[str, str | bool]:
         result = await self.menu_repository.delete(menu_id)
         await self.__check_response(result)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', 'all_menu')
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', menu_id)
+        self.background_task.add_task(dispatch_after_write)
         return result
 
+    async def import_base(self, content_type: str, body: AsyncIterable[bytes]) -> ImportResult:
+        """
+        Imports whole menu trees from a JSON list or an NDJSON stream. Nothing is written if any row is invalid,
+        repeats a row of the document or conflicts with the base: every such row is reported
+
+        :param content_type: media type of the body, 'application/json' or 'application/x-ndjson'
+        :param body: request body chunks
+        :return: number of imported menus, submenus and dishes
+        """
+        if content_type == 'application/x-ndjson':
+            rows = await rows_from_ndjson(body)
+        elif content_type == 'application/json':
+            rows = rows_from_json(b''.join([chunk async for chunk in body]))
+        else:
+            raise HTTPException(status_code=415, detail='body must be application/json or application/x-ndjson')
+        errors = rows.duplicates() or conflicts(rows, await self.menu_repository.find_existing(rows))
+        if errors:
+            raise HTTPException(status_code=409, detail=errors)
+        await self.menu_repository.import_base(rows)
+        self.background_task.add_task(dispatch_after_write)
+        return ImportResult(menus=len(rows.menus), submenus=len(rows.submenus), dishes=len(rows.dishes))
+
     async def delete_all(self) -> None:
-        self.background_task.add_task(redis_client.flushdb)
         await self.menu_repository.delete_all()
+        self.background_task.add_task(dispatch_after_write)
 
     @staticmethod
-    async def __turn_to_model(orm_response) -> MenuResponse:
-        return MenuResponse(id=orm_response.id,
-                            title=orm_response.title,
-                            description=orm_response.description,
-                            submenus_count=await submenus_counter(orm_response.id),
-                            dishes_count=await dishes_counter(menu_id=orm_response.id))
+    def __ndjson_line(**fields) -> bytes:
+        return json.dumps(fields, ensure_ascii=False, separators=(',', ':')).encode() + b'\n'
 
     @staticmethod
     async def __check_response(orm_response) -> None:
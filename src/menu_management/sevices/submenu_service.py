@@ -1,16 +1,17 @@
-from fastapi import BackgroundTasks, Depends, HTTPException
+import uuid
 
-from src.cache.client import RedisClient
-from src.database.models import Submenu
+from fastapi import BackgroundTasks, Depends, HTTPException
 
-# from cache.client import clear_cache, get_cache, set_cache
+from src.cache.client import CacheKey, RedisClient, dumps
+from src.cache.entry import CacheEntry, Page
+from src.cache.outbox import dispatch_after_write, written_events
+from src.menu_management.pagination import decode_cursor, split_page
 from src.menu_management.repository.submenu_repository import SubmenuRepository
 from src.menu_management.schemas.schemas import (
     CreateSubmenu,
     PatchSubmenu,
     SubmenuResponse,
 )
-from src.menu_management.utils import dishes_counter
 
 
 class SubmenuService:
@@ -21,59 +22,78 @@ class SubmenuService:
         self.redis_cache = redis_cache
         self.background_task = background_tasks
 
-    async def get_all_submenus(self, menu_id: str) -> list[SubmenuResponse]:
-        cache = self.redis_cache.get_cache('submenu', 'all_submenu')
-        if cache:
-            return cache
-        submenu_list = await self.submenu_repository.get_list_submenus(menu_id)
-        self.background_task.add_task(self.redis_cache.set_cache, 'submenu', 'all_submenu', submenu_list)
-        return [await self.__turn_to_model(submenu) for submenu in submenu_list]
-
-    async def get_submenu(self, submenu_id: str) -> SubmenuResponse:
-        cache = self.redis_cache.get_cache('submenu', submenu_id)
-        if cache:
-            return cache
-        submenu = await self.submenu_repository.get_submenu(submenu_id)
-        self.background_task.add_task(self.redis_cache.set_cache, 'submenu', submenu_id, submenu)
+    async def get_all_submenus(self, menu_id: str, limit: int, cursor: str | None = None) -> CacheEntry:
+        after = decode_cursor(cursor)
+        return await self.redis_cache.get_or_load(
+            CacheKey.submenu_list(menu_id, limit, cursor), 'submenu', self.submenu_repository,
+            lambda repository: self.__load_submenu_list(repository, menu_id, limit, after))
+
+    @staticmethod
+    async def __load_submenu_list(submenu_repository: SubmenuRepository, menu_id: str, limit: int,
+                                  after: uuid.UUID | None) -> Page:
+        submenus, next_cursor = split_page(await submenu_repository.get_list_submenus(menu_id, limit, after), limit)
+        return Page(dumps([SubmenuResponse(**submenu) for submenu in submenus]), next_cursor)
+
+    async def get_submenu(self, menu_id: str, submenu_id: str) -> CacheEntry:
+        return await self.redis_cache.get_or_load(
+            CacheKey.submenu(menu_id, submenu_id), 'submenu', self.submenu_repository,
+            lambda repository: self.__load_submenu(repository, menu_id, submenu_id))
+
+    async def __load_submenu(self, submenu_repository: SubmenuRepository, menu_id: str, submenu_id: str) -> bytes:
+        submenu = await submenu_repository.get_submenu(menu_id, submenu_id)
         await self.__check_response(submenu)
-        return await self.__turn_to_model(submenu)
+        return dumps(SubmenuResponse(**submenu))
 
-    async def post_submenu(self, menu_id: str, submenu: CreateSubmenu) -> Submenu:
+    async def get_submenus(self, menu_id: str, submenu_ids: list[uuid.UUID]) -> bytes:
+        """
+        Returns a JSON list of the submenus with the given ids in their order, the ids not found are skipped.
+        The submenus share the cache of the single submenu route, the missing ones are loaded with one query
+
+        :return: JSON bytes
+        """
+        submenu_ids = list(dict.fromkeys(submenu_ids))
+
+        async def load_missing(submenu_repository: SubmenuRepository, positions: list[int]) -> dict[int, bytes]:
+            submenus = {submenu['id']: submenu for submenu in await submenu_repository.get_submenus(
+                menu_id, [submenu_ids[position] for position in positions])}
+            return {position: dumps(SubmenuResponse(**submenus[submenu_ids[position]]))
+                    for position in positions if submenu_ids[position] in submenus}
+
+        entries = await self.redis_cache.get_or_load_many(
+            [CacheKey.submenu(menu_id, submenu_id) for submenu_id in submenu_ids], 'submenu',
+            self.submenu_repository, load_missing)
+        return b'[' + b','.join(entry.body for entry in entries if entry is not None) + b']'
+
+    async def post_submenu(self, menu_id: str, submenu: CreateSubmenu) -> SubmenuResponse:
         new_submenu = submenu.to_dict()
         new_submenu['menu_group'] = menu_id
         new_submenu = await self.submenu_repository.add_submenu(new_submenu)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'submenu', 'all_submenu')
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', 'all_menu')
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', menu_id)
-        self.background_task.add_task(self.redis_cache.set_cache, 'submenu', new_submenu.id, new_submenu)
+        new_submenu = SubmenuResponse(id=new_submenu.id, title=new_submenu.title, description=new_submenu.description)
+        self.background_task.add_task(dispatch_after_write,
+                                      values=[(CacheKey.submenu(menu_id, new_submenu.id), dumps(new_submenu),
+                                               'submenu')],
+                                      written=written_events(self.submenu_repository.session))
         return new_submenu
 
-    async def patch_submenu(self, submenu_id: str, submenu: PatchSubmenu) -> SubmenuResponse:
+    async def patch_submenu(self, menu_id: str, submenu_id: str, submenu: PatchSubmenu) -> SubmenuResponse:
         submenu = submenu.to_dict()
         patched_submenu = await self.submenu_repository.update_submenu(submenu_id, submenu)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'submenu', 'all_submenu')
-        self.background_task.add_task(self.redis_cache.set_cache, 'submenu', submenu_id, patched_submenu)
         await self.__check_response(patched_submenu)
-        return await self.__turn_to_model(patched_submenu)
+        patched_submenu = SubmenuResponse(id=patched_submenu.id, title=patched_submenu.title,
+                                          description=patched_submenu.description,
+                                          dishes_count=patched_submenu.dishes_count)
+        self.background_task.add_task(dispatch_after_write,
+                                      values=[(CacheKey.submenu(menu_id, submenu_id), dumps(patched_submenu),
+                                               'submenu')],
+                                      written=written_events(self.submenu_repository.session))
+        return patched_submenu
 
-    async def delete(self, submenu_id: str, menu_id: str) -> dict[str, str | bool]:
+    async def delete(self, menu_id: str, submenu_id: str) -> dict[str, str | bool]:
         result = await self.submenu_repository.delete_submenu(submenu_id)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'submenu', 'all_submenu')
-        self.background_task.add_task(self.redis_cache.clear_cache, 'submenu', submenu_id)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', 'all_menu')
-        self.background_task.add_task(self.redis_cache.clear_cache, 'menu', menu_id)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'dish', submenu_id)
-        self.background_task.add_task(self.redis_cache.clear_cache, 'all_dish', submenu_id)
         await self.__check_response(result)
+        self.background_task.add_task(dispatch_after_write)
         return result
 
-    @staticmethod
-    async def __turn_to_model(orm_response) -> SubmenuResponse:
-        return SubmenuResponse(id=orm_response.id,
-                               title=orm_response.title,
-                               description=orm_response.description,
-                               dishes_count=await dishes_counter(submenu_id=orm_response.id))
-
     @staticmethod
     async def __check_response(orm_response) -> None:
         if not orm_response:
@@ -0,0 +1,41 @@
+from collections import Counter
+
+counters: Counter[str] = Counter()  # sums of observed durations are floats
+gauges: dict[str, float] = {}
+
+
+def increment(name: str, value: int = 1) -> None:
+    counters[name] += value
+
+
+def record(name: str, value: float) -> None:
+    gauges[name] = value
+
+
+def observe(name: str, value: float) -> None:
+    """
+    Adds a measurement to the count and the sum kept under the name and keeps the largest one
+    """
+    counters[f'{name}_count'] += 1
+    counters[f'{name}_sum'] += value
+    gauges[f'{name}_max'] = max(gauges.get(f'{name}_max', 0.0), value)
+
+
+def ratio(hits: str, misses: str) -> float:
+    """
+    Share of hits among all lookups counted under the two counter names
+    """
+    total = counters[hits] + counters[misses]
+    return counters[hits] / total if total else 0.0
+
+
+def snapshot() -> dict[str, float]:
+    """
+    Current values of the counters and gauges of this worker together with the cache hit ratios
+    """
+    return {
+        **counters,
+        **gauges,
+        'cache_l1_hit_ratio': ratio('cache_l1_hits', 'cache_l1_misses'),
+        'cache_l2_hit_ratio': ratio('cache_l2_hits', 'cache_l2_misses'),
+    }
@@ -1,12 +1,14 @@
 import asyncio
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Generator
 
 import pytest
 from httpx import AsyncClient
-from sqlalchemy import NullPool
+from sqlalchemy import NullPool, event
 from sqlalchemy.ext.asyncio import create_async_engine
 
+from src.cache.client import RedisClient
 from src.config import settings
+from src.database.db import engine
 from src.database.models import Base
 from src.main import app
 
@@ -17,12 +19,14 @@ engine_test = create_async_engine(DATABASE_URL_TEST, poolclass=NullPool)
 @pytest.fixture(scope='session', autouse=True)
 async def setup_db() -> AsyncGenerator:
     """
-    Creates tables before tests and drop all tables after tests done
+    Creates tables and drops the cache before tests and drop all tables after tests done.
+    The cache outlives the application, so it may hold entries of rows the tests never created
 
     :return: AsyncGenerator
     """
     async with engine_test.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await RedisClient().flush()
     yield
     async with engine_test.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
@@ -31,13 +35,14 @@ async def setup_db() -> AsyncGenerator:
 @pytest.fixture
 async def clear_db() -> None:
     """
-    Drops the database and create clear database
+    Drops the database and create clear database with an empty cache
 
     :return: None
     """
     async with engine_test.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+    await RedisClient().flush()
 
 
 @pytest.fixture(scope='session')
@@ -84,3 +89,20 @@ async def get_submenu_id(ac: AsyncClient) -> str:
     response = await ac.get(f'/api/v1/menus/{menu_id}/submenus/')
     submenu_id = response.json()[0].get('id')
     return submenu_id
+
+
+@pytest.fixture
+def query_counter() -> Generator[list[str], None, None]:
+    """
+    Collects every SQL statement the application engine sends to the database while the test runs
+
+    :return: list with executed statements
+    """
+    statements: list[str] = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count_statement)
+    yield statements
+    event.remove(engine.sync_engine, 'before_cursor_execute', count_statement)
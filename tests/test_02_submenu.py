@@ -43,7 +43,7 @@ class TestSubmenu:
         assert len(response.json()) == 1
         assert response.json() == [{'id': response.json()[0].get('id'), 'title': 'test_submenu',
                                     'description': 'description', 'dishes_count': 0}]
-        redis_client.flushdb()
+        await redis_client.flushdb()
         response = await ac.get(f'/api/v1/menus/{self.invalid_id}/submenus/')
         assert response.status_code == 404
         assert response.json() == {'detail': f"<class 'asyncpg.exceptions.DataError'>: invalid input for query argument"
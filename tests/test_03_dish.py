@@ -101,6 +101,9 @@ class TestDish:
             (112454, 'dish with non_string title', '12', 422, does_not_raise()),
             ('dish with non string desc.', 12.254, '12', 422, does_not_raise()),
             ('dish with non string price', 'dish desc.', 12, 422, does_not_raise()),
+            ('dish with non numeric price', 'dish desc.', 'twelve', 422, does_not_raise()),
+            ('dish with too high price', 'dish desc.', '100000000', 422, does_not_raise()),
+            ('dish with huge price', 'dish desc.', '1e27', 422, does_not_raise()),
         ]
     )
     async def test_post_incorrect_dish(
@@ -121,6 +124,8 @@ class TestDish:
         - Wrong type title
         - Wrong type description
         - Wrong type price
+        - Price string is not a number
+        - Price does not fit the price column
 
         Expected result:
         - The response status code equal 422.
@@ -0,0 +1,192 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import update
+
+from src.database.counters import reconcile_counters
+from src.database.db import async_session_maker
+from src.database.models import Menu, Submenu
+
+
+@pytest.mark.usefixtures('clear_db')
+class TestQueryCount:
+    """
+    Regression tests for the number of SQL statements sent by the read endpoints.
+    The database must be empty before tests. Uses fixture 'clear_db' for it.
+    """
+    menus: int = 3
+    submenus: int = 2
+    dishes: int = 2
+
+    async def fill_base(self, ac: AsyncClient) -> list[str]:
+        """
+        Adds menus with submenus and dishes to the empty base
+
+        :param ac: Async client from conftest.py
+        :return: list with ids of the added menus
+        """
+        menu_ids = []
+        for menu in range(self.menus):
+            response = await ac.post('/api/v1/menus/', json={
+                'title': f'count_menu_{menu}',
+                'description': 'description'
+            })
+            menu_id = response.json().get('id')
+            menu_ids.append(menu_id)
+            for submenu in range(self.submenus):
+                response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/', json={
+                    'title': f'count_submenu_{menu}_{submenu}',
+                    'description': 'description'
+                })
+                submenu_id = response.json().get('id')
+                for dish in range(self.dishes):
+                    await ac.post(f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/', json={
+                        'title': f'count_dish_{menu}_{submenu}_{dish}',
+                        'description': 'description',
+                        'price': '10.5'
+                    })
+        return menu_ids
+
+    async def test_menu_counts_in_one_query(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test GET requests for /api/v1/menus/ and /api/v1/menus/menu_id send one statement each
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Fill the base with menus, submenus and dishes
+        - Get menu list
+        - Get specific menu
+
+        Expected results:
+        - Get menu list: One statement was executed whatever the number of menus.
+                        Every menu contains right 'submenus_count' and 'dishes_count'.
+        - Get specific menu: One statement was executed.
+                        The menu contains right 'submenus_count' and 'dishes_count'.
+        """
+        menu_ids = await self.fill_base(ac)
+
+        query_counter.clear()
+        response = await ac.get('/api/v1/menus/')
+        assert response.status_code == 200
+        assert len(query_counter) == 1
+        assert len(response.json()) == self.menus
+        for menu in response.json():
+            assert menu.get('submenus_count') == self.submenus
+            assert menu.get('dishes_count') == self.submenus * self.dishes
+
+        query_counter.clear()
+        response = await ac.get(f'/api/v1/menus/{menu_ids[0]}')
+        assert response.status_code == 200
+        assert len(query_counter) == 1
+        assert response.json().get('submenus_count') == self.submenus
+        assert response.json().get('dishes_count') == self.submenus * self.dishes
+
+    async def test_submenu_counts_in_one_query(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test GET requests for /api/v1/menus/menu_id/submenus/ and /api/v1/menus/menu_id/submenus/submenu_id
+        send one statement each
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Fill the base with menus, submenus and dishes
+        - Get submenu list
+        - Get specific submenu
+
+        Expected results:
+        - Get submenu list: One statement was executed whatever the number of submenus.
+                        Every submenu contains right 'dishes_count'.
+        - Get specific submenu: One statement was executed. The submenu contains right 'dishes_count'.
+        """
+        menu_ids = await self.fill_base(ac)
+
+        query_counter.clear()
+        response = await ac.get(f'/api/v1/menus/{menu_ids[-1]}/submenus/')
+        assert response.status_code == 200
+        assert len(query_counter) == 1
+        assert len(response.json()) == self.submenus
+        for submenu in response.json():
+            assert submenu.get('dishes_count') == self.dishes
+
+        submenu_id = response.json()[0].get('id')
+        query_counter.clear()
+        response = await ac.get(f'/api/v1/menus/{menu_ids[-1]}/submenus/{submenu_id}')
+        assert response.status_code == 200
+        assert len(query_counter) == 1
+        assert response.json().get('dishes_count') == self.dishes
+
+    async def test_whole_base_in_three_queries(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test GET request for /api/v1/menus/getbase sends one statement per table
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Fill the base with menus, submenus and dishes
+        - Get the whole base
+
+        Expected results:
+        - Three statements were executed whatever the size of the base.
+        - Every menu contains its submenus and every submenu contains its dishes.
+        - The response contains only the fields of the response schemas.
+        """
+        await self.fill_base(ac)
+
+        query_counter.clear()
+        response = await ac.get('/api/v1/menus/getbase')
+        assert response.status_code == 200
+        assert len(query_counter) == 3
+        assert len(response.json()) == self.menus
+        for menu in response.json():
+            assert set(menu) == {'id', 'title', 'description', 'submenus'}
+            assert len(menu.get('submenus')) == self.submenus
+            for submenu in menu.get('submenus'):
+                assert set(submenu) == {'id', 'title', 'description', 'dishes'}
+                assert len(submenu.get('dishes')) == self.dishes
+                assert submenu.get('dishes')[0].get('price') == '10.50'
+
+    async def test_counters_follow_writes(self, ac: AsyncClient):
+        """
+        Test the stored counters follow deletes, cascade ones included, and are restored by the reconciliation
+
+        :param ac: Async client from conftest.py
+        :return: None
+
+        Scenarios:
+        - Fill the base with menus, submenus and dishes
+        - Delete a dish of the first submenu of the first menu, then delete the second submenu with its dishes
+        - Break the counters with SQL and reconcile them
+
+        Expected results:
+        - After the deletes the menu and the first submenu count the remaining rows.
+        - The reconciliation corrects every menu and submenu and the responses show the actual counts again.
+        - A second reconciliation corrects nothing.
+        """
+        menu_ids = await self.fill_base(ac)
+        menu_url = f'/api/v1/menus/{menu_ids[0]}'
+        submenus = (await ac.get(f'{menu_url}/submenus/')).json()
+        dishes = (await ac.get(f'{menu_url}/submenus/{submenus[0].get("id")}/dishes/')).json()
+
+        await ac.delete(f'{menu_url}/submenus/{submenus[0].get("id")}/dishes/{dishes[0].get("id")}')
+        await ac.delete(f'{menu_url}/submenus/{submenus[1].get("id")}')
+        response = await ac.get(menu_url)
+        assert response.json().get('submenus_count') == self.submenus - 1
+        assert response.json().get('dishes_count') == self.dishes - 1
+        response = await ac.get(f'{menu_url}/submenus/{submenus[0].get("id")}')
+        assert response.json().get('dishes_count') == self.dishes - 1
+
+        async with async_session_maker() as session:
+            await session.execute(update(Menu).values(submenus_count=100, dishes_count=100))
+            await session.execute(update(Submenu).values(dishes_count=100))
+            await session.commit()
+        assert await reconcile_counters() == (self.menus, self.menus * self.submenus - 1)
+        assert await reconcile_counters() == (0, 0)
+        response = await ac.get(menu_url)
+        assert response.json().get('submenus_count') == self.submenus - 1
+        assert response.json().get('dishes_count') == self.dishes - 1
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.usefixtures('clear_db')
+class TestExport:
+    """
+    Test class for the streaming export of the whole base. The database must be empty before tests.
+    Uses fixture 'clear_db' for it.
+    """
+
+    async def test_export_base(self, ac: AsyncClient):
+        """
+        Test GET request for /api/v1/menus/export
+
+        :param ac: Async client from conftest.py
+        :return: None
+
+        Scenarios:
+        - Add a menu with a submenu and a dish and an empty menu
+        - Export the base
+        - Export the base with gzip compression
+
+        Expected results:
+        - Export the base: The response status code equal 200. The content type is application/x-ndjson.
+                        Every line is a JSON object, each child goes right after its parent.
+        - Export the base with gzip compression: The response has 'Content-Encoding: gzip' header.
+                        The decoded body is equal to the uncompressed export.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'export_menu', 'description': 'description'})
+        menu_id = response.json().get('id')
+        response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/', json={
+            'title': 'export_submenu',
+            'description': 'description'
+        })
+        submenu_id = response.json().get('id')
+        response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/', json={
+            'title': 'export_dish',
+            'description': 'description',
+            'price': '12.5'
+        })
+        dish_id = response.json().get('id')
+        await ac.post('/api/v1/menus/', json={'title': 'empty_export_menu', 'description': 'description'})
+
+        response = await ac.get('/api/v1/menus/export')
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 4
+        position = lines.index({'type': 'menu', 'id': menu_id, 'title': 'export_menu', 'description': 'description'})
+        assert lines[position + 1] == {'type': 'submenu', 'id': submenu_id, 'menu_id': menu_id,
+                                       'title': 'export_submenu', 'description': 'description'}
+        assert lines[position + 2] == {'type': 'dish', 'id': dish_id, 'submenu_id': submenu_id,
+                                       'title': 'export_dish', 'description': 'description', 'price': '12.50'}
+
+        compressed = await ac.get('/api/v1/menus/export', params={'gzip': True})
+        assert compressed.status_code == 200
+        assert compressed.headers['content-encoding'] == 'gzip'
+        assert compressed.text == response.text
@@ -0,0 +1,472 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from src.cache.client import CacheKey, RedisClient, dumps, listen_invalidations, local_cache, redis_client
+from src.cache.local import LocalCache
+from src.cache.outbox import add_invalidation, dispatch_outbox, written_events
+from src.cache.warmup import warm_up_cache
+from src.config import settings
+from src.database.db import async_session_maker
+from src.database.models import CacheOutbox
+from src.menu_management.repository.menu_repository import MenuRepository
+from src.menu_management.repository.submenu_repository import SubmenuRepository
+
+
+@pytest.mark.usefixtures('clear_db')
+class TestCache:
+    """
+    Test class for cache hits and misses of the read endpoints. A cache hit sends no statements to the database.
+    The database must be empty before tests. Uses fixture 'clear_db' for it.
+    """
+
+    async def test_cache_hit_and_miss(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test every GET endpoint is served from the cache until a write affecting it
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create two menus, a submenu in each menu and a dish in the first submenu
+        - Get every list and detail twice
+        - Patch the dish
+        - Add a dish to the second submenu
+
+        Expected results:
+        - The first request of every endpoint misses the cache, the second one hits it.
+        - Every menu gets its own submenu list.
+        - Patch the dish: the patched dish is written through and hits with the new title, the rest of the first
+                        menu tree misses, the menu list and the second menu tree still hit.
+        - Add a dish to the second submenu: the second menu tree and the menu list miss,
+                        the first menu tree still hits.
+        """
+        menu_ids, submenu_ids = [], []
+        for number in range(2):
+            response = await ac.post('/api/v1/menus/', json={
+                'title': f'cache_menu_{number}',
+                'description': 'description'
+            })
+            menu_ids.append(response.json().get('id'))
+            response = await ac.post(f'/api/v1/menus/{menu_ids[-1]}/submenus/', json={
+                'title': f'cache_submenu_{number}',
+                'description': 'description'
+            })
+            submenu_ids.append(response.json().get('id'))
+        response = await ac.post(f'/api/v1/menus/{menu_ids[0]}/submenus/{submenu_ids[0]}/dishes/', json={
+            'title': 'cache_dish',
+            'description': 'description',
+            'price': '10'
+        })
+        dish_id = response.json().get('id')
+
+        first_tree = [f'/api/v1/menus/{menu_ids[0]}',
+                      f'/api/v1/menus/{menu_ids[0]}/submenus/',
+                      f'/api/v1/menus/{menu_ids[0]}/submenus/{submenu_ids[0]}',
+                      f'/api/v1/menus/{menu_ids[0]}/submenus/{submenu_ids[0]}/dishes/',
+                      f'/api/v1/menus/{menu_ids[0]}/submenus/{submenu_ids[0]}/dishes/{dish_id}']
+        second_tree = [f'/api/v1/menus/{menu_ids[1]}',
+                       f'/api/v1/menus/{menu_ids[1]}/submenus/',
+                       f'/api/v1/menus/{menu_ids[1]}/submenus/{submenu_ids[1]}']
+
+        async def queries_for(url: str) -> int:
+            query_counter.clear()
+            response = await ac.get(url)
+            assert response.status_code == 200
+            return len(query_counter)
+
+        for url in ['/api/v1/menus/', *first_tree, *second_tree]:
+            await queries_for(url)
+            assert await queries_for(url) == 0, url
+
+        response = await ac.get(f'/api/v1/menus/{menu_ids[1]}/submenus/')
+        assert [submenu.get('id') for submenu in response.json()] == [submenu_ids[1]]
+
+        await ac.patch(first_tree[-1], json={
+            'title': 'patched_cache_dish',
+            'description': 'description',
+            'price': '11'
+        })
+        assert await queries_for(first_tree[-1]) == 0
+        assert (await ac.get(first_tree[-1])).json().get('title') == 'patched_cache_dish'
+        for url in first_tree[:-1]:
+            assert await queries_for(url) == 1, url
+        for url in ['/api/v1/menus/', *first_tree, *second_tree]:
+            assert await queries_for(url) == 0, url
+
+        await ac.post(f'/api/v1/menus/{menu_ids[1]}/submenus/{submenu_ids[1]}/dishes/', json={
+            'title': 'second_cache_dish',
+            'description': 'description',
+            'price': '12'
+        })
+        for url in ['/api/v1/menus/', *second_tree]:
+            assert await queries_for(url) == 1, url
+        for url in first_tree:
+            assert await queries_for(url) == 0, url
+
+    async def test_single_flight(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test concurrent cache misses of the same key send one statement to the database
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Add a menu, the menu list is invalidated
+        - Send 100 simultaneous requests for the menu list
+
+        Expected results:
+        - Every response status code equal 200 and all the bodies are equal.
+        - One statement was executed.
+        """
+        await ac.post('/api/v1/menus/', json={'title': 'single_flight_menu', 'description': 'description'})
+
+        query_counter.clear()
+        responses = await asyncio.gather(*(ac.get('/api/v1/menus/') for _ in range(100)))
+        assert all(response.status_code == 200 for response in responses)
+        assert len({response.content for response in responses}) == 1
+        assert len(query_counter) == 1
+
+    async def test_single_flight_without_local_cache(self, ac: AsyncClient, query_counter: list[str],
+                                                     monkeypatch: pytest.MonkeyPatch):
+        """
+        Test concurrent cache misses of the same key send one statement to the database with the local cache off
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :param monkeypatch: pytest fixture, disables the local cache
+        :return: None
+
+        Scenarios:
+        - Disable the local cache, add a menu, the menu list is invalidated
+        - Send 100 requests for the menu list spread over 50 milliseconds, so some of them miss Redis
+          while the load is finishing
+
+        Expected results:
+        - Every response status code equal 200 and all the bodies are equal.
+        - One statement was executed.
+        """
+        local_cache.clear()
+        monkeypatch.setattr(local_cache, 'maxsize', 0)
+        await ac.post('/api/v1/menus/', json={'title': 'single_flight_menu', 'description': 'description'})
+
+        async def get_menu_list(delay: float):
+            await asyncio.sleep(delay)
+            return await ac.get('/api/v1/menus/')
+
+        query_counter.clear()
+        responses = await asyncio.gather(*(get_menu_list(number / 2000) for number in range(100)))
+        assert all(response.status_code == 200 for response in responses)
+        assert len({response.content for response in responses}) == 1
+        assert len(query_counter) == 1
+
+    async def test_stale_while_revalidate(self, ac: AsyncClient, query_counter: list[str],
+                                          monkeypatch: pytest.MonkeyPatch):
+        """
+        Test a stale entry is served at once and refreshed in the background
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :param monkeypatch: pytest fixture, shortens the menu TTL
+        :return: None
+
+        Scenarios:
+        - Add a menu with a menu TTL of 0.1 second and get the menu list
+        - Wait until the entry is stale, restore the TTL and get the menu list again
+        - Wait for the refresh and get the menu list once more
+
+        Expected results:
+        - The stale response is equal to the fresh one.
+        - The stale request executes no statements before the response, the refresh executes one.
+        - The refreshed entry is served without queries.
+        """
+        monkeypatch.setattr(settings, 'CACHE_MENU_TTL', 0.1)
+        await ac.post('/api/v1/menus/', json={'title': 'stale_menu', 'description': 'description'})
+        fresh = await ac.get('/api/v1/menus/')
+
+        await asyncio.sleep(0.2)
+        monkeypatch.setattr(settings, 'CACHE_MENU_TTL', 300)
+        query_counter.clear()
+        stale = await ac.get('/api/v1/menus/')
+        assert stale.content == fresh.content
+        await asyncio.sleep(0.05)
+        assert len(query_counter) == 1
+
+        query_counter.clear()
+        await ac.get('/api/v1/menus/')
+        assert len(query_counter) == 0
+
+    async def test_warm_up(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test the startup warm-up caches every read endpoint
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create a menu with a submenu and a dish
+        - Drop the cache and warm it up
+        - Get every list and detail
+        - Warm the cache up again, as another worker starting with the same cache would
+
+        Expected results:
+        - No statements are executed and the responses are equal to the ones before the warm-up.
+        - The second warm-up finds the marker of the first one and executes no statements.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'warm_menu', 'description': 'description'})
+        menu_id = response.json().get('id')
+        response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/', json={
+            'title': 'warm_submenu',
+            'description': 'description'
+        })
+        submenu_id = response.json().get('id')
+        response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/', json={
+            'title': 'warm_dish',
+            'description': 'description',
+            'price': '10'
+        })
+        dish_id = response.json().get('id')
+        urls = ['/api/v1/menus/',
+                f'/api/v1/menus/{menu_id}',
+                f'/api/v1/menus/{menu_id}/submenus/',
+                f'/api/v1/menus/{menu_id}/submenus/{submenu_id}',
+                f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/',
+                f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}']
+        expected = [(await ac.get(url)).content for url in urls]
+
+        await RedisClient().flush()
+        await warm_up_cache()
+        query_counter.clear()
+        assert [(await ac.get(url)).content for url in urls] == expected
+        assert len(query_counter) == 0
+
+        await warm_up_cache()
+        assert len(query_counter) == 0
+
+    async def test_warm_up_during_write(self, ac: AsyncClient, monkeypatch: pytest.MonkeyPatch):
+        """
+        Test a write committed while the warm-up fetches the rows is not hidden by the warmed values
+
+        :param ac: Async client from conftest.py
+        :param monkeypatch: pytest fixture, writes from the middle of the warm-up
+        :return: None
+
+        Scenarios:
+        - Create a menu with a submenu, drop the cache
+        - Warm the cache up, create a menu after the menu list is fetched and rename the submenu after
+          the submenu list is fetched
+        - Get the menu list and the submenu list
+
+        Expected results:
+        - Both lists contain the writes made during the warm-up.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'warm_menu', 'description': 'description'})
+        menu_id = response.json().get('id')
+        response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/', json={
+            'title': 'warm_submenu',
+            'description': 'description'
+        })
+        submenus_url = f'/api/v1/menus/{menu_id}/submenus/'
+        submenu_url = f'{submenus_url}{response.json().get("id")}'
+        await RedisClient().flush()
+
+        get_menu_list, get_list_submenus = MenuRepository.get_menu_list, SubmenuRepository.get_list_submenus
+
+        async def get_menu_list_then_write(repository, limit, after):
+            rows = await get_menu_list(repository, limit, after)
+            await ac.post('/api/v1/menus/', json={'title': 'late_menu', 'description': 'description'})
+            return rows
+
+        async def get_list_submenus_then_write(repository, menu_id, limit, after):
+            rows = await get_list_submenus(repository, menu_id, limit, after)
+            await ac.patch(submenu_url, json={'title': 'late_submenu', 'description': 'description'})
+            return rows
+
+        monkeypatch.setattr(MenuRepository, 'get_menu_list', get_menu_list_then_write)
+        monkeypatch.setattr(SubmenuRepository, 'get_list_submenus', get_list_submenus_then_write)
+        await warm_up_cache()
+        monkeypatch.undo()
+
+        assert 'late_menu' in [menu.get('title') for menu in (await ac.get('/api/v1/menus/')).json()]
+        assert [submenu.get('title') for submenu in (await ac.get(submenus_url)).json()] == ['late_submenu']
+
+    async def test_outbox(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test invalidation events committed with a write reach the cache even if the write request did not
+        dispatch them
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Add a menu and get the menu list
+        - Rename the menu in a transaction with its invalidation event, as a worker dying after the commit would
+        - Dispatch the outbox
+
+        Expected results:
+        - Before the dispatch the menu list is served from the cache with the old title.
+        - After the dispatch the menu list is loaded from the database with the new title.
+        - The outbox is empty after every write request and after the dispatch.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'outbox_menu', 'description': 'description'})
+        menu_id = response.json().get('id')
+        await ac.get('/api/v1/menus/')
+
+        async with async_session_maker() as session:
+            assert await session.scalar(select(func.count()).select_from(CacheOutbox)) == 0
+            await MenuRepository(session).patch_menu(menu_id, {'title': 'renamed_outbox_menu'})
+        response = await ac.get('/api/v1/menus/')
+        assert response.json()[0].get('title') == 'outbox_menu'
+
+        assert await dispatch_outbox() == 1
+        query_counter.clear()
+        response = await ac.get('/api/v1/menus/')
+        assert response.json()[0].get('title') == 'renamed_outbox_menu'
+        assert len(query_counter) == 1
+        async with async_session_maker() as session:
+            assert await session.scalar(select(func.count()).select_from(CacheOutbox)) == 0
+
+    async def test_write_through_order(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test the value of a write is cached only if its event is the newest one applied to its menu tree
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create a menu with a submenu and a dish
+        - Apply the events of two updates of the dish with their values in the order of the events
+        - Apply the events of two more updates in the reverse order, as two workers dispatching them would
+
+        Expected results:
+        - In order: the dish is served from the cache with the value of the newer update.
+        - In reverse order: the value of the older update is not cached, the dish is loaded from the database.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'order_menu', 'description': 'description'})
+        menu_id = response.json().get('id')
+        response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/', json={
+            'title': 'order_submenu',
+            'description': 'description'
+        })
+        submenu_id = response.json().get('id')
+        response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/', json={
+            'title': 'order_dish',
+            'description': 'description',
+            'price': '10'
+        })
+        dish = response.json()
+        dish_url = f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish.get("id")}'
+        ids = {'menu_id': menu_id, 'submenu_id': submenu_id, 'dish_id': dish.get('id')}
+        key = CacheKey.dish(menu_id, submenu_id, dish.get('id'))
+        async with async_session_maker() as session:
+            for _ in range(4):
+                await add_invalidation(session, 'dish', 'update', **ids)
+            events = written_events(session)
+            await session.rollback()
+
+        cache = RedisClient()
+        for event_id in events[:2]:
+            await cache.invalidate([(event_id, 'dish', 'update', ids)],
+                                   [(key, dumps({**dish, 'title': f'title_{event_id}'}), 'dish')], [event_id])
+        query_counter.clear()
+        assert (await ac.get(dish_url)).json() == {**dish, 'title': f'title_{events[1]}'}
+        assert len(query_counter) == 0
+
+        for event_id in reversed(events[2:]):
+            await cache.invalidate([(event_id, 'dish', 'update', ids)],
+                                   [(key, dumps({**dish, 'title': f'title_{event_id}'}), 'dish')], [event_id])
+        query_counter.clear()
+        assert (await ac.get(dish_url)).json() == dish
+        assert len(query_counter) == 1
+
+
+class TestLocalCache:
+    """
+    Test class for the in-process cache in front of Redis.
+    """
+
+    async def test_lru_eviction(self):
+        """
+        Test the least recently used entry is evicted when the cache is full
+
+        Expected results:
+        - The cache never holds more entries than maxsize.
+        - A read makes the entry recently used, so the other entry is evicted.
+        """
+        cache = LocalCache(maxsize=2, ttl=60)
+        cache.set('first', b'1')
+        cache.set('second', b'2')
+        assert cache.get('first') == b'1'
+        cache.set('third', b'3')
+        assert len(cache) == 2
+        assert cache.get('second') is None
+        assert cache.get('first') == b'1'
+        assert cache.get('third') == b'3'
+
+    async def test_ttl_and_patterns(self):
+        """
+        Test entries expire after the TTL and patterns evict whole subtrees
+
+        Expected results:
+        - An entry is not returned after its TTL.
+        - A pattern evicts every matching entry and keeps the others.
+        """
+        cache = LocalCache(maxsize=10, ttl=0.05)
+        cache.set('menus', b'[]')
+        await asyncio.sleep(0.1)
+        assert cache.get('menus') is None
+
+        cache.ttl = 60
+        cache.set('menu:1', b'{}')
+        cache.set('menu:1:submenus', b'[]')
+        cache.set('menu:2:submenus', b'[]')
+        cache.delete('menu:1:*')
+        assert cache.get('menu:1') == b'{}'
+        assert cache.get('menu:1:submenus') is None
+        assert cache.get('menu:2:submenus') == b'[]'
+
+    async def test_listener_survives_bad_message(self):
+        """
+        Test the invalidation listener drops the local cache on a message it can not handle and keeps listening
+
+        Expected results:
+        - A malformed message drops the local cache instead of stopping the listener.
+        - A message published once the listener is subscribed again evicts the counter it names only.
+        """
+        async def publish_when_subscribed(message: bytes) -> None:
+            channel = settings.CACHE_INVALIDATION_CHANNEL
+            for _ in range(50):
+                if dict(await redis_client.pubsub_numsub(channel)).get(channel.encode()):
+                    await redis_client.publish(channel, message)
+                    return
+                await asyncio.sleep(0.1)
+            raise AssertionError('the listener is not subscribed')
+
+        async def evicted(key: str) -> bool:
+            for _ in range(50):
+                if local_cache.get(key) is None:
+                    return True
+                await asyncio.sleep(0.1)
+            return False
+
+        listener = asyncio.create_task(listen_invalidations())
+        try:
+            local_cache.set('gen:listener', 1)
+            await publish_when_subscribed(b'not json')
+            assert await evicted('gen:listener')
+
+            local_cache.set('gen:listener', 2)
+            local_cache.set('gen:other', 3)
+            await publish_when_subscribed(dumps(['gen:listener']))
+            assert await evicted('gen:listener')
+            assert local_cache.get('gen:other') == 3
+            assert not listener.done()
+        finally:
+            listener.cancel()
@@ -0,0 +1,88 @@
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.usefixtures('clear_db')
+class TestConditionalRequests:
+    """
+    Test class for ETag and If-None-Match of the GET routes. The database must be empty before tests.
+    Uses fixture 'clear_db' for it.
+    """
+
+    async def test_not_modified(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test every GET route answers 304 to a request with the current ETag
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create a menu with a submenu and a dish
+        - Get every list, detail and the whole base
+        - Repeat every request with the received ETag in If-None-Match, as a weak tag and in a list of tags
+
+        Expected results:
+        - Every response has an ETag and 'Cache-Control: no-cache' headers.
+        - Every repeated request gets 304 with an empty body and the same ETag without queries to the database.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'etag_menu', 'description': 'description'})
+        menu_id = response.json().get('id')
+        response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/', json={
+            'title': 'etag_submenu',
+            'description': 'description'
+        })
+        submenu_id = response.json().get('id')
+        response = await ac.post(f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/', json={
+            'title': 'etag_dish',
+            'description': 'description',
+            'price': '10'
+        })
+        dish_id = response.json().get('id')
+        urls = ['/api/v1/menus/',
+                '/api/v1/menus/getbase',
+                f'/api/v1/menus/{menu_id}',
+                f'/api/v1/menus/{menu_id}/submenus/',
+                f'/api/v1/menus/{menu_id}/submenus/{submenu_id}',
+                f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/',
+                f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}']
+
+        for url in urls:
+            response = await ac.get(url)
+            assert response.status_code == 200, url
+            assert response.headers['cache-control'] == 'no-cache'
+            etag = response.headers['etag']
+            query_counter.clear()
+            for if_none_match in [etag, f'W/{etag}', f'"other", {etag}']:
+                response = await ac.get(url, headers={'If-None-Match': if_none_match})
+                assert response.status_code == 304, url
+                assert response.content == b''
+                assert response.headers['etag'] == etag
+            assert len(query_counter) == 0
+
+    async def test_modified(self, ac: AsyncClient):
+        """
+        Test a write changes the ETag of the affected routes
+
+        :param ac: Async client from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create a menu and get it with the menu list
+        - Patch the menu
+        - Get the menu and the menu list with the old ETags
+
+        Expected results:
+        - The responses have status code 200, the new body and new ETags.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'etag_menu', 'description': 'description'})
+        menu_id = response.json().get('id')
+        urls = ['/api/v1/menus/', f'/api/v1/menus/{menu_id}']
+        etags = [(await ac.get(url)).headers['etag'] for url in urls]
+
+        await ac.patch(f'/api/v1/menus/{menu_id}', json={'title': 'patched_etag_menu', 'description': 'description'})
+        for url, etag in zip(urls, etags):
+            response = await ac.get(url, headers={'If-None-Match': etag})
+            assert response.status_code == 200
+            assert response.headers['etag'] != etag
+            assert 'patched_etag_menu' in response.text
@@ -0,0 +1,84 @@
+import pytest
+from httpx import AsyncClient
+
+from src.config import settings
+
+
+@pytest.mark.usefixtures('clear_db')
+class TestPagination:
+    """
+    Test class for the keyset pagination of the list routes. The database must be empty before tests.
+    Uses fixture 'clear_db' for it.
+    """
+
+    @staticmethod
+    async def read_pages(ac: AsyncClient, url: str, limit: int) -> list[list[dict]]:
+        pages, params = [], {'limit': limit}
+        while True:
+            response = await ac.get(url, params=params)
+            assert response.status_code == 200
+            pages.append(response.json())
+            if 'x-next-cursor' not in response.headers:
+                return pages
+            params['cursor'] = response.headers['x-next-cursor']
+
+    async def test_pages(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test GET requests for the menu, submenu and dish lists page by page
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create 5 menus, 5 submenus in the first menu and 5 dishes in the first submenu
+        - Read every list with limit 2, following X-Next-Cursor
+        - Read every list without a limit
+
+        Expected results:
+        - Every list is split into pages of 2, 2 and 1 items, the last page has no X-Next-Cursor header.
+        - The pages together hold every item once, ordered by id.
+        - Every page is fetched with one statement.
+        - Without a limit the whole list is returned in one page.
+        """
+        urls = ['/api/v1/menus/']
+        for number in range(5):
+            response = await ac.post('/api/v1/menus/', json={'title': f'page_menu_{number}',
+                                                             'description': 'description'})
+        menu_id = response.json().get('id')
+        urls.append(f'/api/v1/menus/{menu_id}/submenus/')
+        for number in range(5):
+            response = await ac.post(urls[-1], json={'title': f'page_submenu_{number}', 'description': 'description'})
+        submenu_id = response.json().get('id')
+        urls.append(f'/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/')
+        for number in range(5):
+            await ac.post(urls[-1], json={'title': f'page_dish_{number}', 'description': 'description', 'price': '1'})
+
+        for url in urls:
+            query_counter.clear()
+            pages = await self.read_pages(ac, url, limit=2)
+            assert [len(page) for page in pages] == [2, 2, 1], url
+            assert len(query_counter) == 3
+            ids = [item.get('id') for page in pages for item in page]
+            assert ids == sorted(set(ids))
+            response = await ac.get(url)
+            assert [item.get('id') for item in response.json()] == ids
+            assert 'x-next-cursor' not in response.headers
+
+    async def test_invalid_parameters(self, ac: AsyncClient):
+        """
+        Test GET requests for the menu list with invalid limit and cursor
+
+        :param ac: Async client from conftest.py
+        :return: None
+
+        Expected results:
+        - A limit below 1 or above PAGE_SIZE_MAX: The response status code equal 422.
+        - A cursor not issued by the server: The response status code equal 400.
+        """
+        for limit in [0, settings.PAGE_SIZE_MAX + 1]:
+            response = await ac.get('/api/v1/menus/', params={'limit': limit})
+            assert response.status_code == 422
+        response = await ac.get('/api/v1/menus/', params={'cursor': 'not-a-cursor'})
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'invalid cursor'}
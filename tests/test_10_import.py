@@ -0,0 +1,142 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.usefixtures('clear_db')
+class TestImport:
+    """
+    Test class for the bulk import of whole menu trees. The database must be empty before tests.
+    Uses fixture 'clear_db' for it.
+    """
+    document = [{
+        'title': 'import_menu',
+        'description': 'description',
+        'submenus': [
+            {'title': 'import_submenu_0', 'description': 'description',
+             'dishes': [{'title': 'import_dish_0', 'description': 'description', 'price': '10.5'},
+                        {'title': 'import_dish_1', 'description': 'description', 'price': '11'}]},
+            {'title': 'import_submenu_1', 'description': 'description'},
+        ]
+    }]
+
+    async def test_import_json(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test POST request for /api/v1/menus/import with a JSON document
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Get the menu list, so it is cached
+        - Import a menu with two submenus and two dishes
+        - Get the menu list and the submenus of the imported menu
+
+        Expected results:
+        - The response status code equal 201, the body holds the number of imported rows.
+        - The rows are written with one statement per table, whatever their number.
+        - The cached menu list is invalidated and the imported menu has the right counters.
+        """
+        assert (await ac.get('/api/v1/menus/')).json() == []
+
+        query_counter.clear()
+        response = await ac.post('/api/v1/menus/import', json=self.document)
+        assert response.status_code == 201
+        assert response.json() == {'menus': 1, 'submenus': 2, 'dishes': 2}
+        assert len([statement for statement in query_counter if statement.startswith('INSERT INTO menu')]) == 1
+        assert len([statement for statement in query_counter if statement.startswith('INSERT INTO dish')]) == 1
+
+        menus = (await ac.get('/api/v1/menus/')).json()
+        assert [(menu.get('title'), menu.get('submenus_count'), menu.get('dishes_count')) for menu in menus] == [
+            ('import_menu', 2, 2)]
+        submenus = (await ac.get(f'/api/v1/menus/{menus[0].get("id")}/submenus/')).json()
+        assert sorted((submenu.get('title'), submenu.get('dishes_count')) for submenu in submenus) == [
+            ('import_submenu_0', 2), ('import_submenu_1', 0)]
+
+    async def test_import_export_round_trip(self, ac: AsyncClient):
+        """
+        Test an NDJSON export imported into an empty base restores it
+
+        :param ac: Async client from conftest.py
+        :return: None
+
+        Scenarios:
+        - Import the document, export the base
+        - Delete the menu and import the export as NDJSON
+
+        Expected results:
+        - The response status code equal 201.
+        - The export of the restored base holds the lines of the first one, ids included.
+        """
+        await ac.post('/api/v1/menus/import', json=self.document)
+        export = await ac.get('/api/v1/menus/export')
+        await ac.delete(f'/api/v1/menus/{json.loads(export.text.splitlines()[0]).get("id")}')
+
+        response = await ac.post('/api/v1/menus/import', content=export.content,
+                                 headers={'Content-Type': 'application/x-ndjson'})
+        assert response.status_code == 201
+        assert response.json() == {'menus': 1, 'submenus': 2, 'dishes': 2}
+        restored = await ac.get('/api/v1/menus/export')
+        assert sorted(restored.text.splitlines()) == sorted(export.text.splitlines())
+
+    async def test_import_errors(self, ac: AsyncClient):
+        """
+        Test an import with wrong or conflicting rows writes nothing and reports every row
+
+        :param ac: Async client from conftest.py
+        :return: None
+
+        Scenarios:
+        - Import a document with a numeric price
+        - Import a document repeating a dish title
+        - Import a document repeating a dish id in three dishes
+        - Import the document twice
+        - Import NDJSON with a dish before any submenu
+
+        Expected results:
+        - A numeric price: The response status code equal 422, the error points to the price.
+        - A repeated dish title: The response status code equal 409, the error points to the repeating dish.
+        - A dish id repeated twice: The response status code equal 409, both repeating dishes are reported.
+        - The second import: The response status code equal 409, every row of the document is reported.
+        - A dish before any submenu: The response status code equal 422, the error points to the line.
+        - Only the first import is written.
+        """
+        document = json.loads(json.dumps(self.document))
+        document[0]['submenus'][0]['dishes'][1]['price'] = 11
+        response = await ac.post('/api/v1/menus/import', json=document)
+        assert response.status_code == 422
+        assert [error.get('loc') for error in response.json().get('detail')] == [
+            [0, 'submenus', 0, 'dishes', 1, 'price']]
+
+        document[0]['submenus'][0]['dishes'][1] = {'title': 'import_dish_0', 'description': 'description',
+                                                   'price': '11'}
+        response = await ac.post('/api/v1/menus/import', json=document)
+        assert response.status_code == 409
+        assert response.json().get('detail') == [{'loc': [0, 'submenus', 0, 'dishes', 1],
+                                                  'msg': 'dish title is repeated in the document'}]
+
+        document = json.loads(json.dumps(self.document))
+        document[0]['submenus'][1]['dishes'] = [{'title': 'import_dish_2', 'description': 'description',
+                                                 'price': '12'}]
+        for submenu_number, dish_number in ((0, 0), (0, 1), (1, 0)):
+            document[0]['submenus'][submenu_number]['dishes'][dish_number]['id'] = (
+                '8d1c1b4e-8e1a-4c1c-9a6e-1d3b5f0c2a7e')
+        response = await ac.post('/api/v1/menus/import', json=document)
+        assert response.status_code == 409
+        assert response.json().get('detail') == [
+            {'loc': [0, 'submenus', 0, 'dishes', 1], 'msg': 'dish id is repeated in the document'},
+            {'loc': [0, 'submenus', 1, 'dishes', 0], 'msg': 'dish id is repeated in the document'}]
+
+        assert (await ac.post('/api/v1/menus/import', json=self.document)).status_code == 201
+        response = await ac.post('/api/v1/menus/import', json=self.document)
+        assert response.status_code == 409
+        assert len(response.json().get('detail')) == 5
+
+        response = await ac.post('/api/v1/menus/import', headers={'Content-Type': 'application/x-ndjson'},
+                                 content=b'{"type": "dish", "title": "t", "description": "d", "price": "1"}\n')
+        assert response.status_code == 422
+        assert response.json().get('detail') == [{'loc': ['line', 1], 'msg': 'dish does not follow its parent'}]
+
+        assert len((await ac.get('/api/v1/menus/')).json()) == 1
@@ -0,0 +1,69 @@
+import uuid
+
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.usefixtures('clear_db')
+class TestBatch:
+    """
+    Test class for the batch reads of dishes and submenus by id. The database must be empty before tests.
+    Uses fixture 'clear_db' for it.
+    """
+
+    async def test_batch_read(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test GET requests for the dishes/batch and submenus/batch routes
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create a menu with three submenus and three dishes in the first submenu
+        - Get every dish and submenu one by one, so they are cached
+        - Get the dishes and the submenus by batch with an unknown id and a repeated id
+        - Get the same batches again
+        - Get a batch with a wrong id
+
+        Expected results:
+        - The response status code equal 200. The items equal the single item responses,
+                        in the requested order, without the unknown id and the repeated one.
+        - The first batches look for the unknown id with one statement each, the second ones execute no statements.
+        - A wrong id: The response status code equal 422.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'batch_menu', 'description': 'description'})
+        menu_url = f'/api/v1/menus/{response.json().get("id")}'
+        submenu_ids, dish_ids = [], []
+        for number in range(3):
+            response = await ac.post(f'{menu_url}/submenus/', json={
+                'title': f'batch_submenu_{number}',
+                'description': 'description'
+            })
+            submenu_ids.append(response.json().get('id'))
+        dishes_url = f'{menu_url}/submenus/{submenu_ids[0]}/dishes'
+        for number in range(3):
+            response = await ac.post(f'{dishes_url}/', json={
+                'title': f'batch_dish_{number}',
+                'description': 'description',
+                'price': f'{number}.5'
+            })
+            dish_ids.append(response.json().get('id'))
+
+        for url, ids in ((f'{dishes_url}', dish_ids), (f'{menu_url}/submenus', submenu_ids)):
+            expected = [(await ac.get(f'{url}/{item_id}')).json() for item_id in ids]
+            requested = [ids[2], str(uuid.uuid4()), ids[0], ids[1], ids[2]]
+
+            query_counter.clear()
+            response = await ac.get(f'{url}/batch', params={'ids': requested})
+            assert response.status_code == 200
+            assert response.json() == [expected[2], expected[0], expected[1]]
+            assert len(query_counter) == 1, url
+
+            query_counter.clear()
+            response = await ac.get(f'{url}/batch', params={'ids': ids})
+            assert response.json() == expected
+            assert len(query_counter) == 0, url
+
+            response = await ac.get(f'{url}/batch', params={'ids': [ids[0], 'wrong_id']})
+            assert response.status_code == 422
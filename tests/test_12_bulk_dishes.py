@@ -0,0 +1,138 @@
+import uuid
+
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.usefixtures('clear_db')
+class TestBulkDishes:
+    """
+    Test class for the bulk patch and the bulk delete of the dishes of a submenu. The database must be empty
+    before tests. Uses fixture 'clear_db' for it.
+    """
+
+    async def test_bulk_patch_and_delete(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test PATCH and DELETE requests for '/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/'
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create a menu with a submenu and three dishes, get every dish
+        - Patch the price of the third dish and the title of the first one
+        - Patch the second dish and an unknown dish
+        - Delete the first two dishes and an unknown dish
+        - Delete them again
+
+        Expected results:
+        - Patch: The response status code equal 200, the dishes are returned in the requested order with the new
+                        values and the other fields unchanged. The patch is one UPDATE statement.
+                        The patched dishes are served from the cache with the new values.
+        - Patch with an unknown dish: The response status code equal 404, the second dish is not changed.
+        - Delete: The response status code equal 200, two dishes are deleted.
+                        The menu and the submenu count one dish and the dish list holds the third dish only.
+        - Delete again: The response body equal {'status': False, 'message': 'The dishes not found'},
+                        the cache outbox is not dispatched.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'bulk_menu', 'description': 'description'})
+        menu_url = f'/api/v1/menus/{response.json().get("id")}'
+        response = await ac.post(f'{menu_url}/submenus/', json={'title': 'bulk_submenu', 'description': 'description'})
+        submenu_url = f'{menu_url}/submenus/{response.json().get("id")}'
+        dishes = []
+        for number in range(3):
+            response = await ac.post(f'{submenu_url}/dishes/', json={
+                'title': f'bulk_dish_{number}',
+                'description': 'description',
+                'price': '10'
+            })
+            dishes.append(response.json())
+            await ac.get(f'{submenu_url}/dishes/{dishes[-1].get("id")}')
+
+        query_counter.clear()
+        response = await ac.patch(f'{submenu_url}/dishes/', json=[
+            {'id': dishes[2].get('id'), 'price': '12.345'},
+            {'id': dishes[0].get('id'), 'title': 'patched_bulk_dish'},
+        ])
+        assert response.status_code == 200
+        assert response.json() == [{**dishes[2], 'price': '12.35'}, {**dishes[0], 'title': 'patched_bulk_dish'}]
+        assert len([statement for statement in query_counter if statement.startswith('UPDATE dish')]) == 1
+        query_counter.clear()
+        for dish in response.json():
+            assert (await ac.get(f'{submenu_url}/dishes/{dish.get("id")}')).json() == dish
+        assert len(query_counter) == 0
+
+        response = await ac.patch(f'{submenu_url}/dishes/', json=[
+            {'id': dishes[1].get('id'), 'price': '1'},
+            {'id': str(uuid.uuid4()), 'price': '1'},
+        ])
+        assert response.status_code == 404
+        assert (await ac.get(f'{submenu_url}/dishes/{dishes[1].get("id")}')).json() == dishes[1]
+
+        ids = [dishes[0].get('id'), dishes[1].get('id'), str(uuid.uuid4())]
+        response = await ac.delete(f'{submenu_url}/dishes/', params={'ids': ids})
+        assert response.status_code == 200
+        assert response.json() == {'status': True, 'message': '2 dishes have been deleted'}
+        assert (await ac.get(menu_url)).json().get('dishes_count') == 1
+        assert (await ac.get(submenu_url)).json().get('dishes_count') == 1
+        assert [dish.get('id') for dish in (await ac.get(f'{submenu_url}/dishes/')).json()] == [dishes[2].get('id')]
+
+        query_counter.clear()
+        response = await ac.delete(f'{submenu_url}/dishes/', params={'ids': ids})
+        assert response.json() == {'status': False, 'message': 'The dishes not found'}
+        assert not any('cache_outbox' in statement for statement in query_counter)
+
+    async def test_dish_of_another_submenu(self, ac: AsyncClient, query_counter: list[str]):
+        """
+        Test PATCH and DELETE requests for a dish through the path of another submenu
+
+        :param ac: Async client from conftest.py
+        :param query_counter: list with executed statements from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create a menu with two submenus and a dish in the first one, get the dish
+        - Patch and delete the dish through the path of the second submenu
+        - Patch the dish through its own path
+
+        Expected results:
+        - Through the path of the second submenu: The response status code equal 404 for the patch,
+                        the response body equal {'status': False, 'message': 'The dish not found'} for the delete.
+                        The delete does not dispatch the cache outbox.
+                        The dish is not changed and the menu still counts it.
+        - Through its own path: The response status code equal 200, the patched dish is returned by the next read.
+        """
+        response = await ac.post('/api/v1/menus/', json={'title': 'path_menu', 'description': 'description'})
+        menu_url = f'/api/v1/menus/{response.json().get("id")}'
+        submenu_urls = []
+        for number in range(2):
+            response = await ac.post(f'{menu_url}/submenus/', json={
+                'title': f'path_submenu_{number}',
+                'description': 'description'
+            })
+            submenu_urls.append(f'{menu_url}/submenus/{response.json().get("id")}')
+        response = await ac.post(f'{submenu_urls[0]}/dishes/', json={
+            'title': 'path_dish',
+            'description': 'description',
+            'price': '10'
+        })
+        dish = response.json()
+        dish_url = f'{submenu_urls[0]}/dishes/{dish.get("id")}'
+        other_url = f'{submenu_urls[1]}/dishes/{dish.get("id")}'
+        assert (await ac.get(dish_url)).json() == dish
+
+        response = await ac.patch(other_url, json={'title': 'wrong_path_dish', 'description': 'description',
+                                                   'price': '1'})
+        assert response.status_code == 404
+        query_counter.clear()
+        response = await ac.delete(other_url)
+        assert response.json() == {'status': False, 'message': 'The dish not found'}
+        assert not any('cache_outbox' in statement for statement in query_counter)
+        assert (await ac.get(dish_url)).json() == dish
+        assert (await ac.get(menu_url)).json().get('dishes_count') == 1
+
+        response = await ac.patch(dish_url, json={'title': 'patched_path_dish', 'description': 'description',
+                                                  'price': '1'})
+        assert response.status_code == 200
+        assert (await ac.get(dish_url)).json() == response.json()
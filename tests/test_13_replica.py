@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import NullPool, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.cache.client import RedisClient
+from src.config import settings
+from src.database import db
+from src.main import app
+
+
+@pytest.mark.usefixtures('clear_db')
+class TestReplica:
+    """
+    Test class for the routing of reads to a replica. The replica is a second engine on the test database.
+    The database must be empty before tests. Uses fixture 'clear_db' for it.
+    """
+
+    async def test_read_routing(self, monkeypatch: pytest.MonkeyPatch, query_counter: list[str]):
+        """
+        Test GET requests read from the replica unless the client is pinned to the primary
+
+        :param monkeypatch: pytest fixture
+        :param query_counter: list with executed statements of the primary from conftest.py
+        :return: None
+
+        Scenarios:
+        - Create a menu, drop the cache and get the menu with the cookie of the write
+        - Drop the cache and the cookie, get the menu again
+        - Drop the cache, get the menu at once with and without the cookie
+
+        Expected results:
+        - The response to the write sets the 'db_primary' cookie, the read with it runs on the primary
+          and does not touch the replica.
+        - Without the cookie the menu is read from the replica.
+        - The read with the cookie does not await the load from the replica, it runs on the primary.
+        - Every read returns the created menu.
+        """
+        replica_engine = create_async_engine(settings.db_url, poolclass=NullPool)
+        statements: list[str] = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+            statements.append(statement)
+
+        event.listen(replica_engine.sync_engine, 'before_cursor_execute', count_statement)
+        monkeypatch.setattr(db, 'replica_session_maker',
+                            async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False))
+
+        async with (AsyncClient(app=app, base_url='http://test') as client,
+                    AsyncClient(app=app, base_url='http://test') as pinned_client):
+            response = await client.post('/api/v1/menus/', json={'title': 'replica_menu', 'description': 'description'})
+            assert response.cookies.get(db.PRIMARY_PIN_COOKIE) == '1'
+            menu = response.json()
+            menu_url = f'/api/v1/menus/{menu.get("id")}'
+
+            await RedisClient().flush()
+            query_counter.clear()
+            assert (await client.get(menu_url)).json() == menu
+            assert len(query_counter) > 0
+            assert statements == []
+
+            await RedisClient().flush()
+            client.cookies.clear()
+            assert (await client.get(menu_url)).json() == menu
+            assert len(statements) > 0
+
+            await RedisClient().flush()
+            query_counter.clear()
+            pinned_client.cookies.set(db.PRIMARY_PIN_COOKIE, '1')
+            responses = await asyncio.gather(client.get(menu_url), pinned_client.get(menu_url))
+            assert [response.json() for response in responses] == [menu, menu]
+            assert len(query_counter) > 0
+
+        await replica_engine.dispose()
+
+    async def test_read_your_writes(self, monkeypatch: pytest.MonkeyPatch):
+        """
+        Test a client reads its own write although another client missed the cache first and the replica lags.
+        The lagging replica is a REPEATABLE READ transaction on the test database opened before the write
+
+        :param monkeypatch: pytest fixture
+        :return: None
+
+        Scenarios:
+        - Create a menu and get it, open the lagging replica
+        - Patch the menu and create a submenu with the cookie of the write
+        - Get the menu, the menu list and the submenu list without the cookie, then with it
+
+        Expected results:
+        - Every read, with or without the cookie, returns the patched menu and the new submenu.
+        """
+        replica_engine = create_async_engine(settings.db_url, poolclass=NullPool)
+        async with (AsyncClient(app=app, base_url='http://test') as writer,
+                    AsyncClient(app=app, base_url='http://test') as reader):
+            menu = (await writer.post('/api/v1/menus/', json={'title': 'lagging_menu',
+                                                              'description': 'description'})).json()
+            menu_url = f'/api/v1/menus/{menu.get("id")}'
+            assert (await reader.get(menu_url)).json() == menu
+
+            async with replica_engine.connect() as replica:
+                await replica.execution_options(isolation_level='REPEATABLE READ')
+                await replica.execute(select(1))
+                monkeypatch.setattr(db, 'replica_session_maker',
+                                    async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False))
+
+                await writer.patch(menu_url, json={'title': 'patched_lagging_menu', 'description': 'description'})
+                response = await writer.post(f'{menu_url}/submenus/',
+                                             json={'title': 'lagging_submenu', 'description': 'description'})
+                submenu = response.json()
+                assert writer.cookies.get(db.PRIMARY_PIN_COOKIE) == '1'
+                for client in (reader, writer):
+                    assert (await client.get(menu_url)).json().get('title') == 'patched_lagging_menu'
+                    assert (await client.get(menu_url)).json().get('submenus_count') == 1
+                    assert [item.get('title') for item in (await client.get('/api/v1/menus/')).json()] == [
+                        'patched_lagging_menu']
+                    assert (await client.get(f'{menu_url}/submenus/')).json() == [submenu]
+
+        await replica_engine.dispose()